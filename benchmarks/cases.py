@@ -0,0 +1,218 @@
+# benchmarks/cases.py
+import random
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+
+from utils.brackets import WALL, bracket_needs
+from utils.catalog import BRACKETS_PATH, load_catalog, parse_workbooks
+from utils.create_test_data import SERIES_ARTICLES, create_test_matrix_data
+from utils.exporter import EXPORT_CACHE, create_excel_file, export_to_csv
+from utils.importer import import_meteor_spec, match_foreign_spec
+from utils.matcher import CompetitorMatcher
+from utils.order import Order
+from utils.quote import prepare_spec_data
+from utils.specification import add_total_row, order_frame, spec_totals
+
+# Размеры заказов (строк) по умолчанию
+SIZES = [10, 100, 1_000, 10_000]
+
+# Доля строк спецификации конкурента, которые не разбираются шаблонами
+# и уходят в нечеткий поиск
+FOREIGN_UNPARSED_SHARE = 0.1
+
+# Условия расчета во всех замерах
+RADIATOR_DISCOUNT = 5
+BRACKET_DISCOUNT = 10
+
+# Зарегистрированные замеры: имя -> (функция подготовки, зависит ли от размера заказа)
+CASES = {}
+
+
+def case(name, sized=True):
+    """
+    Регистрирует замер.
+
+    Функция подготовки получает BenchData и размер заказа (или None для
+    замеров, не зависящих от размера) и возвращает функцию без аргументов,
+    время которой измеряется. Подготовка в замер не входит.
+    """
+    def register(setup):
+        CASES[name] = (setup, sized)
+        return setup
+    return register
+
+
+class BenchData:
+    """
+    Синтетический каталог и заказы для замеров.
+
+    Матрица создается utils.create_test_data с числом серий, достаточным
+    для заказа из max_size разных позиций, кронштейны берутся из рабочего
+    файла. Заказы, строки и спецификации каждого размера строятся один раз
+    и разделяются замерами.
+    """
+
+    def __init__(self, data_dir, max_size=max(SIZES), brackets_path=BRACKETS_PATH, seed=0):
+        self.data_dir = Path(data_dir)
+        self.matrix_path = self.data_dir / "Матрица.xlsx"
+        self.snapshot_path = self.data_dir / "Матрица.snapshot.pkl"
+        self.brackets_path = Path(brackets_path)
+        self.series = -(-max_size // SERIES_ARTICLES)
+
+        if not self.matrix_path.exists():
+            create_test_matrix_data(str(self.matrix_path), self.series)
+        self.catalog = load_catalog(self.matrix_path, self.brackets_path, self.snapshot_path)
+
+        self.items = list(self.catalog.articles.values())
+        if len(self.items) < max_size:
+            raise ValueError(f"В тестовом каталоге {len(self.items)} позиций, нужно {max_size}")
+        random.Random(seed).shuffle(self.items)
+        self._cache = {}
+
+    def _memo(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def order(self, size):
+        """Заказ из size разных позиций с количествами 1-7"""
+        def build():
+            rng = random.Random(size)
+            order = Order()
+            order.add_many((item, rng.randint(1, 7)) for item in self.items[:size])
+            return order
+        return self._memo(("order", size), build)
+
+    def lines(self, size):
+        return self._memo(("lines", size), lambda: order_frame(self.order(size), self.catalog))
+
+    def spec(self, size):
+        """Спецификация с итоговой строкой и итоги"""
+        def build():
+            spec_data, totals = prepare_spec_data(
+                self.order(size), self.catalog, RADIATOR_DISCOUNT, BRACKET_DISCOUNT, WALL
+            )
+            return add_total_row(spec_data, totals), totals
+        return self._memo(("spec", size), build)
+
+    def meteor_file(self, size, file_type):
+        """Байты спецификации METEOR (артикул, количество) в формате xlsx или csv"""
+        def build():
+            order = self.order(size)
+            df = pd.DataFrame(
+                [(line.item.art, line.qty) for line in order.lines()], columns=["Артикул", "Кол-во"]
+            )
+            return _file_bytes(df, file_type)
+        return self._memo(("meteor", size, file_type), build)
+
+    def foreign_file(self, size):
+        """Байты спецификации другого производителя (наименование, количество) в xlsx"""
+        def build():
+            rng = random.Random(size)
+            names = []
+            for item in self.items[:size]:
+                if rng.random() < FOREIGN_UNPARSED_SHARE:
+                    names.append(f"Радиатор панельный {item.rad_type}/{item.height}/{item.length} боковой")
+                else:
+                    letter = "K" if item.connection == "K-боковое" else "VC"
+                    names.append(
+                        f"Панельный стальной радиатор тип {letter} {item.rad_type}-{item.height}-{item.length}"
+                    )
+            df = pd.DataFrame({"Наименование": names, "Кол-во": [rng.randint(1, 7) for _ in names]})
+            return _file_bytes(df, "excel")
+        return self._memo(("foreign", size), build)
+
+
+def _file_bytes(df, file_type):
+    buffer = BytesIO()
+    if file_type == "excel":
+        df.to_excel(buffer, index=False, engine="openpyxl")
+    else:
+        df.to_csv(buffer, index=False, sep=';', encoding='utf-8-sig')
+    return buffer.getvalue()
+
+
+@case("catalog_parse", sized=False)
+def catalog_parse(data, size):
+    """Разбор Excel файлов каталога (первый запуск, снимка нет)"""
+    return lambda: parse_workbooks(data.matrix_path, data.brackets_path)
+
+
+@case("catalog_snapshot", sized=False)
+def catalog_snapshot(data, size):
+    """Загрузка каталога из актуального снимка (обычный запуск)"""
+    return lambda: load_catalog(data.matrix_path, data.brackets_path, data.snapshot_path)
+
+
+@case("lookup")
+def lookup(data, size):
+    """Поиск size позиций по артикулу и по ячейке матрицы (лист, высота, длина)"""
+    catalog = data.catalog
+    items = data.items[:size]
+
+    def run():
+        for item in items:
+            catalog.lookup(item.art)
+            catalog.find(item.sheet, item.height, item.length)
+    return run
+
+
+@case("prepare_spec_data")
+def prepare_spec(data, size):
+    order = data.order(size)
+    return lambda: prepare_spec_data(order, data.catalog, RADIATOR_DISCOUNT, BRACKET_DISCOUNT, WALL)
+
+
+@case("brackets")
+def brackets(data, size):
+    lines = data.lines(size)
+    return lambda: bracket_needs(lines, WALL)
+
+
+@case("totals")
+def totals(data, size):
+    lines = data.lines(size)
+    spec_data, _ = prepare_spec_data(data.order(size), data.catalog, RADIATOR_DISCOUNT, BRACKET_DISCOUNT, WALL)
+    return lambda: spec_totals(lines, spec_data)
+
+
+@case("create_excel_file")
+def excel_file(data, size):
+    spec_with_total, totals = data.spec(size)
+    return lambda: create_excel_file(
+        spec_with_total, totals.power, totals.weight, totals.volume, totals.sum
+    )
+
+
+@case("export_to_csv")
+def csv_file(data, size):
+    """Экспорт в CSV без готового файла в кэше экспорта"""
+    spec_with_total, _ = data.spec(size)
+
+    def run():
+        EXPORT_CACHE.clear()
+        export_to_csv(spec_with_total)
+    return run
+
+
+@case("import_meteor_xlsx")
+def import_meteor_xlsx(data, size):
+    content = data.meteor_file(size, "excel")
+    return lambda: import_meteor_spec(BytesIO(content), "excel", data.catalog, Order())
+
+
+@case("import_meteor_csv")
+def import_meteor_csv(data, size):
+    content = data.meteor_file(size, "csv")
+    return lambda: import_meteor_spec(BytesIO(content), "csv", data.catalog, Order())
+
+
+@case("match_foreign")
+def match_foreign(data, size):
+    """Подбор аналогов с новым CompetitorMatcher: без запомненных наименований и нечеткого индекса"""
+    content = data.foreign_file(size)
+    return lambda: match_foreign_spec(
+        BytesIO(content), "excel", CompetitorMatcher(data.catalog), data.catalog, Order()
+    )
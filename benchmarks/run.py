@@ -0,0 +1,170 @@
+# benchmarks/run.py
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from benchmarks.cases import CASES, SIZES, BenchData
+
+RESULTS_DIR = Path("benchmarks/results")
+
+# Повторов замера по умолчанию и ограничение времени на один замер
+REPEATS = 5
+MAX_CASE_SECONDS = 10.0
+
+# Во сколько раз замер может стать медленнее при сравнении, прежде чем считаться регрессией
+REGRESSION_RATIO = 1.2
+
+# Версия формата файла результатов
+RESULTS_VERSION = 1
+
+
+def git_revision():
+    """Текущий коммит и признак незафиксированных изменений (или None вне git)"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, bool(dirty)
+
+
+def environment():
+    """Окружение замера: коммит, версии Python и библиотек, платформа"""
+    commit, dirty = git_revision()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "openpyxl": openpyxl.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def time_case(run, repeats=REPEATS, max_seconds=MAX_CASE_SECONDS):
+    """
+    Время выполнения run() в секундах по нескольким повторам.
+
+    Первый вызов - прогрев (импорты, кэши правил), в результат не входит.
+    Повторы прекращаются досрочно, если замер занял больше max_seconds.
+    """
+    run()
+    times = []
+    started = time.perf_counter()
+    for _ in range(max(repeats, 1)):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+        if time.perf_counter() - started > max_seconds:
+            break
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "repeats": len(times),
+    }
+
+
+def run_suite(data, names=None, sizes=SIZES, repeats=REPEATS, progress=None):
+    """Выполняет выбранные замеры для всех размеров заказа, возвращает список результатов"""
+    results = []
+    for name, (setup, sized) in CASES.items():
+        if names and name not in names:
+            continue
+        for size in (sizes if sized else [None]):
+            result = {"case": name, "size": size, **time_case(setup(data, size), repeats)}
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return results
+
+
+def compare(results, baseline, ratio=REGRESSION_RATIO):
+    """
+    Сравнение с результатами другого коммита по медиане.
+
+    Возвращает строки (замер, размер, было, стало, отношение, регрессия).
+    """
+    before = {(row["case"], row["size"]): row["median"] for row in baseline["results"]}
+    rows = []
+    for row in results:
+        old = before.get((row["case"], row["size"]))
+        if old is None or old <= 0:
+            continue
+        change = row["median"] / old
+        rows.append((row["case"], row["size"], old, row["median"], change, change > ratio))
+    return rows
+
+
+def _format_size(size):
+    return "-" if size is None else str(size)
+
+
+def main(argv=None):
+    """Замеры производительности каталога, спецификации, экспорта и импорта"""
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетическом каталоге")
+    parser.add_argument('-o', '--output', help=f"файл результатов JSON (по умолчанию {RESULTS_DIR}/<коммит>.json)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="размеры заказов, строк")
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), help="только указанные замеры")
+    parser.add_argument('-r', '--repeats', type=int, default=REPEATS, help="повторов каждого замера")
+    parser.add_argument('--data-dir', help="каталог синтетических данных (по умолчанию временный)")
+    parser.add_argument('--compare', help="JSON результатов другого коммита для сравнения")
+    parser.add_argument('--ratio', type=float, default=REGRESSION_RATIO,
+                        help="замедление, которое считается регрессией")
+    args = parser.parse_args(argv)
+
+    def report(result):
+        print(f"{result['case']:<20} {_format_size(result['size']):>6} "
+              f"{result['median'] * 1000:10.2f} мс  (min {result['min'] * 1000:.2f}, n={result['repeats']})")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data = BenchData(args.data_dir or tmp_dir, max_size=max(args.sizes))
+        results = run_suite(data, args.cases, args.sizes, args.repeats, progress=report)
+        catalog_items = len(data.items)
+
+    payload = {
+        "version": RESULTS_VERSION,
+        "environment": environment(),
+        "catalog_items": catalog_items,
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{payload['environment']['commit'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"Результаты: {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        rows = compare(results, baseline, args.ratio)
+        regressions = 0
+        for name, size, old, new, change, slower in rows:
+            regressions += slower
+            mark = "  <- регрессия" if slower else ""
+            print(f"{name:<20} {_format_size(size):>6} {old * 1000:10.2f} -> {new * 1000:10.2f} мс  x{change:.2f}{mark}")
+        print(f"Сравнение с {baseline['environment'].get('commit')}: регрессий {regressions} из {len(rows)}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,20 @@
 # pages/01_🏠_Главная.py
 import streamlit as st
-from pathlib import Path
 import pandas as pd
-import numpy as np
 import re
 
+from utils.brackets import BRACKET_TYPES
+from utils.catalog import HEIGHTS, LENGTHS
+from utils.data_loader import get_catalog
+from utils.order import Order
+from utils.session_manager import get_order_state, start_profiling
+
+profiler = start_profiling("Главная")
+
 # === Загрузка данных ===
-@st.cache_data
-def load_data():
-    matrix_path = Path("data/Матрица.xlsx")
-    brackets_path = Path("data/Кронштейны.xlsx")
-    if not matrix_path.exists():
-        st.error("❌ Файл 'Матрица.xlsx' не найден")
-        st.stop()
-    if not brackets_path.exists():
-        st.error("❌ Файл 'Кронштейны.xlsx' не найден")
-        st.stop()
-    
-    sheets = pd.read_excel(matrix_path, sheet_name=None, engine="openpyxl")
-    brackets_df = pd.read_excel(brackets_path, engine="openpyxl")
-    
-    # Обработка кронштейнов
-    if "Кронштейны" in sheets:
-        brackets_df = sheets["Кронштейны"].copy()
-        del sheets["Кронштейны"]
-    
-    brackets_df['Артикул'] = brackets_df['Артикул'].astype(str).str.strip()
-    
-    # Обработка листов с радиаторами
-    for name, df in sheets.items():
-        df['Артикул'] = df['Артикул'].astype(str).str.strip()
-        df['Вес, кг'] = pd.to_numeric(df['Вес, кг'], errors='coerce').fillna(0)
-        df['Объем, м3'] = pd.to_numeric(df['Объем, м3'], errors='coerce').fillna(0)
-        df['Мощность, Вт'] = df.get('Мощность, Вт', '')
-    
-    return sheets, brackets_df
-
-sheets, brackets_df = load_data()
+with profiler.stage("Загрузка данных"):
+    catalog = get_catalog()
+sheets, brackets_df = catalog.sheets, catalog.brackets
 
 # === Инициализация состояния ===
 if "connection" not in st.session_state:
@@ -49,14 +27,18 @@ if "radiator_discount" not in st.session_state:
     st.session_state.radiator_discount = 0.0
 if "bracket_discount" not in st.session_state:
     st.session_state.bracket_discount = 0.0
-if "entry_values" not in st.session_state:
-    st.session_state.entry_values = {}
+if "order" not in st.session_state:
+    st.session_state.order = Order()
 if "show_tooltips" not in st.session_state:
     st.session_state.show_tooltips = False
 if "last_validation_error" not in st.session_state:
     st.session_state.last_validation_error = None
 if "show_selected_items" not in st.session_state:
     st.session_state.show_selected_items = False
+if "matrix_mode" not in st.session_state:
+    st.session_state.matrix_mode = "Ячейки"
+
+order_state = get_order_state(catalog)
     
 
 # === Функции из tkinter приложения ===
@@ -68,56 +50,13 @@ def validate_input(val):
     pattern = r'^[\d+]+$'
     return bool(re.match(pattern, val))
 
-def parse_quantity(value):
-    """
-    Преобразует введенное значение в количество радиаторов.
-    Обрабатывает целые числа, числа с плавающей точкой и комбинации с плюсами.
-    """
-    try:
-        if isinstance(value, str) and value.strip() in ["Кол-во", "№"]:
-            return 0
-            
-        if not value:
-            return 0
-        
-        if isinstance(value, (int, float)):
-            return int(round(float(value)))
-    
-        value = str(value).strip()
-        
-        # Удаляем лишние знаки '+' в начале и конце
-        while value.startswith('+'):
-            value = value[1:]
-        while value.endswith('+'):
-            value = value[:-1]
-        
-        if not value:
-            return 0
-        
-        parts = value.split('+')
-        total = 0
-        for part in parts:
-            part = part.strip()
-            if part:
-                total += int(round(float(part)))
-                
-        return total
-    except Exception as e:
-        print(f"Ошибка преобразования количества: {str(e)}")
-        return 0
-
 def get_product_info(sheet_name, art):
     """Получает информацию о продукте по артикулу"""
-    if sheet_name in sheets:
-        data = sheets[sheet_name]
-        product = data[data['Артикул'] == art]
-        if not product.empty:
-            return product.iloc[0]
-    return None
+    return catalog.lookup(art, sheet_name)
 
 def has_any_value():
     """Проверяет, есть ли хотя бы одно значение во всех матрицах"""
-    return any(val and val != "0" for val in st.session_state.entry_values.values())
+    return bool(st.session_state.order)
 
 def get_cell_color(has_values, cell_value):
     """Определяет цвет ячейки"""
@@ -129,80 +68,94 @@ def get_cell_color(has_values, cell_value):
         return "white"    # Белый если нет заполненных ячеек
 
 def get_selected_items():
-    """Получает список выбранных позиций"""
-    selected_items = []
-    for key, value in st.session_state.entry_values.items():
-        if value and value != "0":
-            # Ключ имеет формат: "VK-правое_10_7724651420"
-            # Или: "input_0_0_VK-правое_10_7724651420" для полей ввода
-            parts = key.split('_')
-            
-            # Если ключ начинается с "input", пропускаем первые 3 части
-            if key.startswith('input_'):
-                if len(parts) >= 6:
-                    # Собираем sheet_name из оставшихся частей
-                    sheet_parts = parts[3:-1]  # Все части кроме последней (артикул)
-                    art = parts[-1]
-                    sheet_name = ' '.join(sheet_parts)
-                else:
-                    continue
-            else:
-                # Старый формат ключа
-                if len(parts) >= 3:
-                    sheet_name = f"{parts[0]} {parts[1]}"
-                    art = parts[2]
-                else:
-                    continue
-            
-            product = get_product_info(sheet_name, art)
-            if product is not None:
-                qty = parse_quantity(value)
-                selected_items.append({
-                    'Артикул': art,
-                    'Наименование': product['Наименование'],
-                    'Количество': qty,
-                    'Вес, кг': product['Вес, кг'],
-                    'Лист': sheet_name
-                })
-    return selected_items
-
-def get_brackets_for_radiator(radiator, bracket_type):
-    """Подбирает кронштейны для радиатора в зависимости от типа крепления"""
-    if bracket_type == "Без кронштейнов":
-        return []
-    
-    # Получаем вес радиатора
-    weight = radiator['Вес, кг']
-    
-    # Определяем тип кронштейна для поиска
-    if bracket_type == "Настенные кронштейны":
-        search_pattern = "настен"
-    else:  # Напольные кронштейны
-        search_pattern = "напольн"
-    
-    # Ищем подходящие кронштейны
-    suitable_brackets = []
-    
-    for _, bracket in brackets_df.iterrows():
-        bracket_name = str(bracket['Наименование']).lower()
+    """Получает список выбранных позиций (пересчитываются только измененные строки)"""
+    with profiler.stage("Выбранные позиции"):
+        return order_state.selected_items(st.session_state.order)
+
+def build_matrix_frame(sheet_name):
+    """Текущие значения матрицы листа: строки - длины, столбцы - высоты"""
+    order = st.session_state.order
+    columns = {}
+    for height in HEIGHTS:
+        values = []
+        for length in LENGTHS:
+            product = catalog.find(sheet_name, height, length)
+            value = order.raw(product.art) if product else ""
+            values.append("" if value == "0" else value)
+        columns[str(height)] = values
+    return pd.DataFrame(columns, index=pd.Index(LENGTHS, name="Длина"))
+
+def apply_matrix_edits(sheet_name, edited):
+    """
+    Проверяет всю отредактированную матрицу разом и записывает
+    допустимые значения в заказ за один проход
+    """
+    cells = edited.stack(dropna=False).fillna("").astype(str).str.strip()
+    valid = cells.str.fullmatch(r'[\d+]*')
+    
+    products = [
+        catalog.find(sheet_name, int(height), int(length))
+        for length, height in cells[valid].index
+    ]
+    present = [product is not None for product in products]
+    st.session_state.order.set_many(
+        [product for product in products if product is not None],
+        cells[valid][present],
+    )
+    
+    invalid = cells[~valid]
+    if invalid.empty:
+        st.session_state.last_validation_error = None
+    else:
+        cells_text = ", ".join(f"{length}x{height}: '{value}'" for (length, height), value in invalid.items())
+        st.session_state.last_validation_error = f"Неверный ввод ({cells_text}). Можно вводить только цифры и знак +"
+
+def render_matrix_editor(sheet_name):
+    """Матрица в виде редактируемой таблицы: все изменения применяются одной отправкой формы"""
+    with st.form(f"matrix_form_{sheet_name}"):
+        edited = st.data_editor(
+            build_matrix_frame(sheet_name),
+            use_container_width=True,
+            column_config={
+                str(height): st.column_config.TextColumn(str(height), validate=r'^[\d+]*$')
+                for height in HEIGHTS
+            },
+        )
+        submitted = st.form_submit_button("✅ Применить изменения")
+    
+    if submitted:
+        apply_matrix_edits(sheet_name, edited)
+
+def get_order_brackets(bracket_type):
+    """Кронштейны для всего заказа по общей таблице правил"""
+    with profiler.stage("Кронштейны"):
+        totals = order_state.bracket_totals(st.session_state.order, bracket_type)
+        needs = pd.DataFrame({'Артикул': list(totals), 'Количество': list(totals.values())})
+        return needs.merge(brackets_df[['Артикул', 'Наименование']], on='Артикул', how='inner', sort=False)
+
+def get_selection_table(bracket_type):
+    """
+    Общий список позиций (радиаторы и кронштейны) и число кронштейнов.
+    
+    Пересчитывается только при изменении заказа или типа крепления.
+    """
+    def build():
+        radiators = pd.DataFrame(get_selected_items())[['Артикул', 'Наименование', 'Количество']]
+        brackets = get_order_brackets(bracket_type)
+        df = pd.concat([
+            radiators.assign(Тип='Радиатор'),
+            brackets.assign(Тип='Кронштейн')
+        ], ignore_index=True)
         
-        # Проверяем соответствие типу
-        if search_pattern in bracket_name:
-            # Проверяем максимальную нагрузку кронштейна
-            max_load = bracket.get('Макс_нагрузка', 0)
-            try:
-                max_load = float(max_load)
-                if max_load >= weight:
-                    suitable_brackets.append({
-                        'Артикул': bracket['Артикул'],
-                        'Наименование': bracket['Наименование'],
-                        'Макс_нагрузка': max_load,
-                        'Количество': radiator['Количество']  # Столько же сколько радиаторов
-                    })
-            except (ValueError, TypeError):
-                continue
-    
-    return suitable_brackets
+        # Группируем по артикулу и наименованию, суммируя количество
+        grouped_df = df.groupby(['Артикул', 'Наименование', 'Тип']).agg({
+            'Количество': 'sum'
+        }).reset_index()
+        return grouped_df, int(brackets['Количество'].sum())
+    
+    key = (st.session_state.order.version, bracket_type)
+    with profiler.stage("Таблица позиций"):
+        return order_state.memo('selection_table', key, build)
 
 # === Компактный CSS с улучшениями ===
 st.markdown("""
@@ -419,103 +372,112 @@ with col2:
     )
     st.session_state.radiator_type = rad_type
 
+matrix_modes = ["Ячейки", "Таблица"]
+matrix_mode = st.radio(
+    "Режим ввода",
+    matrix_modes,
+    index=matrix_modes.index(st.session_state.matrix_mode),
+    horizontal=True,
+    help="В режиме «Таблица» вся матрица редактируется целиком и применяется одной кнопкой"
+)
+st.session_state.matrix_mode = matrix_mode
+
 # === Матрица радиаторов ===
 sheet_name = f"{st.session_state.connection} {st.session_state.radiator_type}"
 
-if sheet_name not in sheets:
-    st.error(f"Лист '{sheet_name}' не найден")
-else:
-    data = sheets[sheet_name]
-    lengths = list(range(400, 2100, 100))
-    heights = [300, 400, 500, 600, 900]
-    
-    # Проверяем, есть ли заполненные ячейки для подсветки
-    has_values = has_any_value()
-    
-    # Создаем матрицу как в tkinter версии
-    st.markdown("---")
-    
-    # Создаем контейнер для заголовков высот
-    height_cols = st.columns(len(heights) + 1)
-    
-    # Пустая ячейка в углу
-    with height_cols[0]:
-        st.markdown("")  # Пустое место
-    
-    # Подпись "Высота радиаторов, мм" над заголовками высот
-    for j in range(len(heights) + 1):
-        with height_cols[j]:
-            if j == 0:
-                # Первая колонка - подпись "Длина"
-                st.markdown("<div style='text-align: center; font-weight: bold; margin: 0; padding: 0;'></div>", unsafe_allow_html=True)
-            else:
-                # Остальные колонки - высоты
-                st.markdown(f"<div style='text-align: center; font-weight: bold; margin: 0; padding: 0;'>{heights[j-1]}</div>", unsafe_allow_html=True)
-    
-    # Тело матрицы - длины и ячейки ввода
-    for i, length in enumerate(lengths):
-        cols = st.columns(len(heights) + 1)
+with profiler.stage("Матрица"):
+    if sheet_name not in sheets:
+        st.error(f"Лист '{sheet_name}' не найден")
+    elif matrix_mode == "Таблица":
+        st.markdown("---")
+        render_matrix_editor(sheet_name)
+    else:
+        lengths = LENGTHS
+        heights = HEIGHTS
+    
+        # Проверяем, есть ли заполненные ячейки для подсветки
+        has_values = has_any_value()
+    
+        # Создаем матрицу как в tkinter версии
+        st.markdown("---")
+    
+        # Создаем контейнер для заголовков высот
+        height_cols = st.columns(len(heights) + 1)
+    
+        # Пустая ячейка в углу
+        with height_cols[0]:
+            st.markdown("")  # Пустое место
+    
+        # Подпись "Высота радиаторов, мм" над заголовками высот
+        for j in range(len(heights) + 1):
+            with height_cols[j]:
+                if j == 0:
+                    # Первая колонка - подпись "Длина"
+                    st.markdown("<div style='text-align: center; font-weight: bold; margin: 0; padding: 0;'></div>", unsafe_allow_html=True)
+                else:
+                    # Остальные колонки - высоты
+                    st.markdown(f"<div style='text-align: center; font-weight: bold; margin: 0; padding: 0;'>{heights[j-1]}</div>", unsafe_allow_html=True)
+    
+        # Тело матрицы - длины и ячейки ввода
+        for i, length in enumerate(lengths):
+            cols = st.columns(len(heights) + 1)
         
-        # Заголовок строки - длина (без звездочек)
-        with cols[0]:
-            st.markdown(f"<div class='matrix-header' style='margin: 0; padding: 0;'>{length}</div>", unsafe_allow_html=True)
+            # Заголовок строки - длина (без звездочек)
+            with cols[0]:
+                st.markdown(f"<div class='matrix-header' style='margin: 0; padding: 0;'>{length}</div>", unsafe_allow_html=True)
         
-        # Ячейки ввода
-        for j, height in enumerate(heights):
-            pattern = f"/{height}/{length}"
-            match = data[data['Наименование'].str.contains(pattern, na=False)]
+            # Ячейки ввода
+            for j, height in enumerate(heights):
+                product = catalog.find(sheet_name, height, length)
             
-            if not match.empty:
-                product = match.iloc[0]
-                art = str(product['Артикул']).strip()
-                # Создаем простой ключ для хранения значения
-                simple_key = f"{sheet_name.replace(' ', '_')}_{art}"
-                current_value = st.session_state.entry_values.get(simple_key, "")
+                if product is not None:
+                    art = product.art
+                    simple_key = f"{sheet_name.replace(' ', '_')}_{art}"
+                    current_value = st.session_state.order.raw(art)
                 
-                # Убираем нули из отображения
-                display_value = current_value if current_value != "0" else ""
+                    # Убираем нули из отображения
+                    display_value = current_value if current_value != "0" else ""
                 
-                with cols[j + 1]:
-                    # Создаем уникальный ключ для каждого поля ввода
-                    input_key = f"input_{i}_{j}_{simple_key}"
+                    with cols[j + 1]:
+                        # Создаем уникальный ключ для каждого поля ввода
+                        input_key = f"input_{i}_{j}_{simple_key}"
                     
-                    # Определяем цвет фона
-                    cell_color = get_cell_color(has_values, current_value)
+                        # Определяем цвет фона
+                        cell_color = get_cell_color(has_values, current_value)
                     
-                    # Создаем поле ввода с кастомным стилем
-                    new_value = st.text_input(
-                        f"Ячейка {length}x{height}",
-                        value=display_value,
-                        key=input_key,
-                        label_visibility="collapsed",
-                        placeholder=""
-                    )
+                        # Создаем поле ввода с кастомным стилем
+                        new_value = st.text_input(
+                            f"Ячейка {length}x{height}",
+                            value=display_value,
+                            key=input_key,
+                            label_visibility="collapsed",
+                            placeholder=""
+                        )
                     
-                    # Валидация ввода при изменении
-                    if new_value != display_value:
-                        if validate_input(new_value):
-                            # Сохраняем валидное значение по простому ключу
-                            st.session_state.entry_values[simple_key] = new_value
-                            st.session_state.last_validation_error = None
-                            st.rerun()  # Перезагружаем для обновления цвета
-                        else:
-                            # Сохраняем ошибку и восстанавливаем предыдущее значение
-                            st.session_state.last_validation_error = f"Неверный ввод: '{new_value}'. Можно вводить только цифры и знак +"
-                            # Восстанавливаем предыдущее значение
-                            st.session_state.entry_values[simple_key] = current_value
-                            st.rerun()
+                        # Валидация ввода при изменении
+                        if new_value != display_value:
+                            if validate_input(new_value):
+                                # Сохраняем валидное значение в заказ
+                                st.session_state.order.set(product, new_value)
+                                st.session_state.last_validation_error = None
+                                st.rerun()  # Перезагружаем для обновления цвета
+                            else:
+                                # Сохраняем ошибку, значение в заказе остается прежним.
+                                # Без st.rerun(): поле сохраняет неверное значение,
+                                # и перезапуск повторялся бы бесконечно
+                                st.session_state.last_validation_error = f"Неверный ввод: '{new_value}'. Можно вводить только цифры и знак +"
                     
-                    # Применяем стили через CSS классы
-                    st.markdown(f"""
-                    <style>
-                    [data-testid="stTextInput"] [value="{new_value}"] {{
-                        background-color: {cell_color} !important;
-                        text-align: center !important;
-                        font-size: 14px !important;
-                        font-weight: 500 !important;
-                    }}
-                    </style>
-                    """, unsafe_allow_html=True)
+                        # Применяем стили через CSS классы
+                        st.markdown(f"""
+                        <style>
+                        [data-testid="stTextInput"] [value="{new_value}"] {{
+                            background-color: {cell_color} !important;
+                            text-align: center !important;
+                            font-size: 14px !important;
+                            font-weight: 500 !important;
+                        }}
+                        </style>
+                        """, unsafe_allow_html=True)
 
 # === Показываем ошибки валидации ===
 if st.session_state.last_validation_error:
@@ -531,7 +493,7 @@ col1, col2 = st.columns([1, 1])
 
 with col1:
     st.markdown("**Тип крепления**")
-    bracket_options = ["Настенные кронштейны", "Напольные кронштейны", "Без кронштейнов"]
+    bracket_options = BRACKET_TYPES
     
     # Добавляем CSS класс для вертикального расположения
     st.markdown('<div class="vertical-radio">', unsafe_allow_html=True)
@@ -565,59 +527,28 @@ with col2:
     st.session_state.bracket_discount = br_disc
 
 # === Информация о заполненных ячейках ===
-filled_cells = sum(1 for val in st.session_state.entry_values.values() if val and val != "0")
+filled_cells = st.session_state.order.filled
 if filled_cells > 0:
     st.success(f"✅ Заполнено ячеек: {filled_cells}")
     
     # === ВЫБРАННЫЕ ПОЗИЦИИ (всегда показываем) ===
-    selected_items = get_selected_items()
-    if selected_items:
+    if st.session_state.order:
         st.markdown("### Выбранные позиции")
         
-        # Создаем общий список всех позиций (радиаторы + кронштейны)
-        all_items = []
-        
-        # Добавляем радиаторы
-        for item in selected_items:
-            all_items.append({
-                'Артикул': item['Артикул'],
-                'Наименование': item['Наименование'],
-                'Количество': item['Количество'],
-                'Тип': 'Радиатор'
-            })
-        
-        # Добавляем кронштейны для каждого радиатора
-        for radiator in selected_items:
-            brackets = get_brackets_for_radiator(radiator, st.session_state.bracket_type)
-            for bracket in brackets:
-                all_items.append({
-                    'Артикул': bracket['Артикул'],
-                    'Наименование': bracket['Наименование'],
-                    'Количество': bracket['Количество'],
-                    'Тип': 'Кронштейн'
-                })
-        
-        # Создаем DataFrame для отображения
-        df = pd.DataFrame(all_items)
-        
-        # Группируем по артикулу и наименованию, суммируя количество
-        grouped_df = df.groupby(['Артикул', 'Наименование', 'Тип']).agg({
-            'Количество': 'sum'
-        }).reset_index()
+        # Общий список всех позиций: радиаторы и кронштейны
+        grouped_df, total_brackets = get_selection_table(st.session_state.bracket_type)
         
         # Отображаем таблицу
         st.dataframe(grouped_df, use_container_width=True)
         
         # Показываем итоговую информацию
-        total_radiators = sum(item['Количество'] for item in selected_items)
-        total_brackets = sum(bracket['Количество'] for radiator in selected_items 
-                           for bracket in get_brackets_for_radiator(radiator, st.session_state.bracket_type))
+        total_radiators = st.session_state.order.total_qty
         
         st.info(f"**Итого позиций:** {len(grouped_df)}, **Радиаторов:** {total_radiators}, **Кронштейнов:** {total_brackets}")
 
 # === Кнопка сброса ===
 if st.button("🔄 Сбросить все"):
-    st.session_state.entry_values.clear()
+    st.session_state.order.clear()
     st.session_state.radiator_discount = 0.0
     st.session_state.bracket_discount = 0.0
     st.session_state.bracket_type = "Настенные кронштейны"
@@ -627,9 +558,36 @@ if st.button("🔄 Сбросить все"):
 
 # === Отладочная информация (можно удалить) ===
 with st.expander("Отладочная информация"):
-    st.write("Заполненные значения:", {k: v for k, v in st.session_state.entry_values.items() if v and v != "0"})
-    st.write("Все значения:", dict(st.session_state.entry_values))
+    st.write("Заполненные значения:", {line.item.art: line.raw for line in st.session_state.order.lines()})
+    st.write("Все значения:", st.session_state.order.entries())
     st.write("Есть ли заполненные ячейки:", has_any_value())
     st.write("Текущий лист:", sheet_name)
     st.write("Выбранные позиции:", get_selected_items())
-    st.write("Ключи entry_values:", list(st.session_state.entry_values.keys()))
\ No newline at end of file
+    st.write("Версия заказа:", st.session_state.order.version)
+    
+    # Замеры перезапусков (см. utils/profiling.py)
+    profiling = st.checkbox(
+        "Замеры перезапусков",
+        value=st.session_state.profiling,
+        help="Время и число вызовов этапов каждого перезапуска страниц"
+    )
+    if profiling != st.session_state.profiling:
+        st.session_state.profiling = profiling
+        st.rerun()
+    
+    if profiler.active:
+        if st.button("Снимок cProfile следующего перезапуска",
+                     help="Подробный профиль одного перезапуска (самые долгие функции)"):
+            profiler.request_profile()
+            st.rerun()
+        st.write("Текущий перезапуск (до этой панели):")
+        st.dataframe(pd.DataFrame(profiler.current.rows()), use_container_width=True, hide_index=True)
+    if profiler.history:
+        st.write("Последние перезапуски, мс:")
+        st.dataframe(pd.DataFrame(profiler.history_rows()), use_container_width=True, hide_index=True)
+    profiled = next((timings for timings in reversed(profiler.history) if timings.profile), None)
+    if profiled is not None:
+        st.write(f"Снимок cProfile перезапуска {profiled.started:%H:%M:%S} ({profiled.total * 1000:.0f} мс):")
+        st.dataframe(pd.DataFrame(profiled.profile), use_container_width=True, hide_index=True)
+
+profiler.end()
\ No newline at end of file
@@ -0,0 +1,431 @@
+# utils/api.py
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from functools import lru_cache
+from http import HTTPStatus
+from urllib.parse import quote as url_quote
+
+import numpy as np
+
+from utils.brackets import BRACKET_TYPES, FLOOR, NO_BRACKETS, WALL
+from utils.catalog import load_catalog
+from utils.quantity import parse_quantity
+from utils.quote import build_quote, order_from_lines
+
+# Сколько последних расчетов запоминается (одинаковые заказы не пересчитываются)
+QUOTE_CACHE_SIZE = 4096
+
+# Число потоков для расчетов и экспорта XLSX
+QUOTE_THREADS = 4
+
+# Предельный размер тела запроса
+MAX_BODY_BYTES = 4 * 1024 * 1024
+
+# Наибольшее количество одного артикула в заказе (после сложения строк)
+MAX_ARTICLE_QTY = 1_000_000
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+XLSX_FILENAME = "Расчёт стоимости радиаторов METEOR.xlsx"
+
+# Короткие обозначения типа крепления в запросе
+MOUNT_ALIASES = {"wall": WALL, "floor": FLOOR, "none": NO_BRACKETS}
+
+# Количество-формула в запросе: числа через '+', как в матрице
+QTY_FORMULA = re.compile(r'[\s+]*(?:\d+(?:\.\d+)?(?:\s*\++\s*\d+(?:\.\d+)?)*)?[\s+]*')
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteRequestError(ValueError):
+    """Неверный запрос расчета (ответ 400)"""
+
+
+def parse_quote_request(payload):
+    """
+    Проверяет JSON-запрос расчета.
+
+    Формат: {"lines": [{"art": "7724651304", "qty": 2}, ...],
+    "radiator_discount": 0, "bracket_discount": 0, "bracket_type": "wall"}.
+    Строка может быть и парой ["артикул", количество], количество - числом
+    или формулой "2+3"; количества строк одного артикула вместе - не
+    больше MAX_ARTICLE_QTY. Возвращает (строки, скидка на радиаторы, скидка на
+    кронштейны, тип крепления) в виде, пригодном для ключа кэша.
+    """
+    if not isinstance(payload, dict):
+        raise QuoteRequestError("Ожидается JSON-объект")
+
+    raw_lines = payload.get("lines")
+    if not isinstance(raw_lines, list):
+        raise QuoteRequestError("Поле 'lines' должно быть списком строк заказа")
+
+    lines = []
+    for i, line in enumerate(raw_lines):
+        if isinstance(line, dict) and "art" in line:
+            art, qty = line["art"], line.get("qty", 0)
+        elif isinstance(line, (list, tuple)) and len(line) == 2:
+            art, qty = line
+        else:
+            raise QuoteRequestError(f"Строка {i + 1}: ожидается {{'art': ..., 'qty': ...}}")
+        lines.append((str(art).strip(), _line_quantity(qty, i + 1)))
+
+    discounts = []
+    for field in ("radiator_discount", "bracket_discount"):
+        value = payload.get(field, 0) or 0
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+            raise QuoteRequestError(f"Поле '{field}' должно быть числом от 0 до 100")
+        discounts.append(float(value))
+
+    totals = {}
+    for art, qty in lines:
+        totals[art] = totals.get(art, 0) + qty
+        if totals[art] > MAX_ARTICLE_QTY:
+            raise QuoteRequestError(f"Количество артикула {art} больше {MAX_ARTICLE_QTY}")
+
+    bracket_type = payload.get("bracket_type", WALL)
+    if isinstance(bracket_type, str):
+        bracket_type = MOUNT_ALIASES.get(bracket_type, bracket_type)
+    if bracket_type not in BRACKET_TYPES:
+        choices = ", ".join([*MOUNT_ALIASES, *BRACKET_TYPES])
+        raise QuoteRequestError(f"Поле 'bracket_type' должно быть одним из: {choices}")
+
+    return tuple(lines), discounts[0], discounts[1], bracket_type
+
+
+def _line_quantity(qty, number):
+    """Количество строки number запроса; неверное или слишком большое - QuoteRequestError"""
+    if isinstance(qty, str):
+        if QTY_FORMULA.fullmatch(qty) is None:
+            raise QuoteRequestError(f"Строка {number}: количество должно быть числом или формулой вида 2+3")
+        parsed = parse_quantity(qty)
+        # parse_quantity дает 0 при переполнении int64
+        overflow = parsed == 0 and any(float(part) for part in qty.split('+') if part.strip())
+        if overflow or parsed > MAX_ARTICLE_QTY:
+            raise QuoteRequestError(f"Строка {number}: количество вне допустимого диапазона")
+        return parsed
+
+    if isinstance(qty, bool) or not isinstance(qty, (int, float)):
+        raise QuoteRequestError(f"Строка {number}: количество должно быть числом или формулой вида 2+3")
+    if not (math.isfinite(qty) and 0 <= qty <= MAX_ARTICLE_QTY):
+        raise QuoteRequestError(f"Строка {number}: количество вне допустимого диапазона")
+    return parse_quantity(qty)
+
+
+class QuoteService:
+    """
+    Расчеты по заказам в формате JSON поверх одного каталога на процесс.
+
+    Каталог загружается при первом обращении (или при старте сервера),
+    расчеты одинаковых запросов запоминаются в LRU-кэше, а готовые XLSX -
+    в общем кэше экспорта. Расчет и экспорт выполняются в пуле потоков,
+    чтобы не блокировать цикл событий.
+    """
+
+    def __init__(self, catalog=None, threads=QUOTE_THREADS, cache_size=QUOTE_CACHE_SIZE):
+        self._catalog = catalog
+        self._lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="quote")
+        self._quote = lru_cache(maxsize=cache_size)(self._build)
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            with self._lock:
+                if self._catalog is None:
+                    self._catalog = load_catalog()
+        return self._catalog
+
+    def quote(self, payload):
+        """Расчет по JSON-запросу: (Quote, ненайденные артикулы)"""
+        return self._quote(*parse_quote_request(payload))
+
+    def quote_json(self, payload):
+        """Ответ на запрос расчета: строки спецификации, итоги и, по запросу, XLSX"""
+        quote, missing = self.quote(payload)
+        result = {
+            "lines": quote.spec.to_dict('records'),
+            "totals": asdict(quote.totals) if quote.totals is not None else None,
+            "missing": list(missing),
+        }
+        if payload.get("xlsx"):
+            data = quote.to_xlsx()
+            result["xlsx"] = base64.b64encode(data).decode('ascii') if data else None
+        return result
+
+    def quote_xlsx(self, payload):
+        """Байты XLSX расчета или None, если в заказе нет позиций"""
+        quote, _ = self.quote(payload)
+        return quote.to_xlsx()
+
+    def _build(self, lines, radiator_discount, bracket_discount, bracket_type):
+        try:
+            order, missing = order_from_lines(self.catalog, lines, MAX_ARTICLE_QTY)
+        except ValueError as e:
+            raise QuoteRequestError(str(e)) from e
+        quote = build_quote(order, self.catalog, radiator_discount, bracket_discount, bracket_type)
+        return quote, tuple(missing)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+
+def _json_body(data):
+    return json.dumps(data, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_BYTES:
+            raise OverflowError
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+async def _respond(send, status, body, content_type="application/json; charset=utf-8", headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': int(status),
+        'headers': [
+            (b'content-type', content_type.encode()),
+            (b'content-length', str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _error(send, status, message):
+    await _respond(send, status, _json_body({"error": message}))
+
+
+def create_app(service=None):
+    """
+    ASGI-приложение расчетов.
+
+    GET /health - состояние; POST /quote - расчет в JSON (с "xlsx": true
+    добавляется файл в base64); POST /quote.xlsx - файл расчета.
+    Неверный запрос - ответ 400, непредвиденная ошибка - 500, оба с JSON
+    {"error": ...}.
+    """
+    service = service or QuoteService()
+    routes = {"/health": "GET", "/quote": "POST", "/quote.xlsx": "POST"}
+
+    async def app(scope, receive, send):
+        loop = asyncio.get_running_loop()
+
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    # Каталог загружается до первого запроса
+                    await loop.run_in_executor(service.pool, lambda: service.catalog)
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    service.pool.shutdown(wait=False)
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+
+        if scope['type'] != 'http':
+            return
+
+        try:
+            return await handle_http(scope, receive, send)
+        except Exception:
+            logger.exception("Ошибка обработки %s %s", scope['method'], scope['path'])
+            return await _error(send, HTTPStatus.INTERNAL_SERVER_ERROR, "Внутренняя ошибка сервиса")
+
+    async def handle_http(scope, receive, send):
+        loop = asyncio.get_running_loop()
+        path, method = scope['path'], scope['method']
+        if path not in routes:
+            return await _error(send, HTTPStatus.NOT_FOUND, "Неизвестный адрес")
+        if method != routes[path]:
+            return await _error(send, HTTPStatus.METHOD_NOT_ALLOWED, f"Ожидается {routes[path]}")
+
+        if path == "/health":
+            catalog = await loop.run_in_executor(service.pool, lambda: service.catalog)
+            return await _respond(send, HTTPStatus.OK, _json_body({
+                "status": "ok", "radiators": len(catalog.articles),
+            }))
+
+        try:
+            payload = json.loads(await _read_body(receive) or b"null")
+        except OverflowError:
+            return await _error(send, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Слишком большой запрос")
+        except ValueError:
+            return await _error(send, HTTPStatus.BAD_REQUEST, "Тело запроса должно быть JSON")
+
+        try:
+            if path == "/quote":
+                result = await loop.run_in_executor(service.pool, service.quote_json, payload)
+                return await _respond(send, HTTPStatus.OK, _json_body(result))
+
+            data = await loop.run_in_executor(service.pool, service.quote_xlsx, payload)
+            if data is None:
+                return await _error(send, HTTPStatus.UNPROCESSABLE_ENTITY, "В заказе нет позиций каталога")
+            disposition = f"attachment; filename*=UTF-8''{url_quote(XLSX_FILENAME)}"
+            return await _respond(send, HTTPStatus.OK, data, XLSX_MIME,
+                                  [(b'content-disposition', disposition.encode())])
+
+        except QuoteRequestError as e:
+            return await _error(send, HTTPStatus.BAD_REQUEST, str(e))
+
+    return app
+
+
+async def _reject(writer, status):
+    """Ответ без тела на запрос, который сервер не передает приложению; соединение закрывается"""
+    writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                 "content-length: 0\r\nconnection: close\r\n\r\n".encode())
+    await writer.drain()
+
+
+async def serve(app, host="127.0.0.1", port=8000):
+    """
+    Простой HTTP/1.1 сервер для локального запуска ASGI-приложения без
+    сторонних пакетов (keep-alive, тело по Content-Length).
+    """
+    startup = asyncio.Queue()
+    await startup.put({'type': 'lifespan.startup'})
+    started = asyncio.Event()
+
+    async def lifespan_send(message):
+        if message['type'] == 'lifespan.startup.complete':
+            started.set()
+
+    lifespan = asyncio.create_task(app({'type': 'lifespan'}, startup.get, lifespan_send))
+    await started.wait()
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode('latin-1').split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    return await _reject(writer, HTTPStatus.BAD_REQUEST)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                length = headers.get('content-length', "0") or "0"
+                if not length.isdigit():
+                    return await _reject(writer, HTTPStatus.BAD_REQUEST)
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    return await _reject(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+
+                path, _, query = target.partition("?")
+                scope = {
+                    'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': version[5:],
+                    'method': method.upper(), 'path': path, 'raw_path': path.encode(),
+                    'query_string': query.encode(), 'scheme': 'http', 'root_path': '',
+                    'headers': [(name.encode(), value.encode()) for name, value in headers.items()],
+                    'client': writer.get_extra_info('peername'), 'server': (host, port),
+                }
+                response = {}
+
+                async def receive():
+                    return {'type': 'http.request', 'body': body, 'more_body': False}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        response['status'] = message['status']
+                        response['headers'] = message.get('headers', [])
+                    else:
+                        response.setdefault('body', bytearray()).extend(message.get('body', b''))
+
+                try:
+                    await app(scope, receive, send)
+                except Exception:
+                    logger.exception("Ошибка приложения %s %s", method, path)
+                    if 'status' in response:
+                        return
+                    response.clear()
+                    await _error(send, HTTPStatus.INTERNAL_SERVER_ERROR, "Внутренняя ошибка сервиса")
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == "HTTP/1.1"
+                status = HTTPStatus(response['status'])
+                out = [f"HTTP/1.1 {status.value} {status.phrase}".encode()]
+                out += [name + b": " + value for name, value in response['headers']]
+                out.append(b"connection: " + (b"keep-alive" if keep_alive else b"close"))
+                writer.write(b"\r\n".join(out) + b"\r\n\r\n" + bytes(response.get('body', b"")))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Сервис расчетов: http://{host}:{port} (POST /quote, POST /quote.xlsx, GET /health)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await startup.put({'type': 'lifespan.shutdown'})
+        await lifespan
+
+
+def main(argv=None):
+    """Запуск сервиса расчетов из командной строки"""
+    parser = argparse.ArgumentParser(description="HTTP-сервис расчетов METEOR (ASGI)")
+    parser.add_argument('--host', default="127.0.0.1", help="адрес")
+    parser.add_argument('--port', type=int, default=8000, help="порт")
+    parser.add_argument('--threads', type=int, default=QUOTE_THREADS, help="потоков для расчетов и экспорта")
+    parser.add_argument('--server', choices=("auto", "builtin", "uvicorn"), default="auto",
+                        help="uvicorn, если установлен, иначе встроенный сервер")
+    args = parser.parse_args(argv)
+
+    application = create_app(QuoteService(threads=args.threads))
+    if args.server != "builtin":
+        try:
+            import uvicorn
+        except ImportError:
+            if args.server == "uvicorn":
+                raise
+        else:
+            uvicorn.run(application, host=args.host, port=args.port)
+            return
+
+    try:
+        asyncio.run(serve(application, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+def __getattr__(name):
+    """
+    ASGI-приложение `app` для `uvicorn utils.api:app`: создается при первом
+    обращении, чтобы импорт модуля не запускал пул потоков.
+    """
+    if name == "app":
+        application = globals()["app"] = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# utils/batch.py
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from utils.brackets import BRACKET_TYPES, WALL
+from utils.catalog import BRACKETS_PATH, MATRIX_PATH, SNAPSHOT_PATH, load_catalog
+from utils.importer import import_meteor_spec, match_foreign_spec
+from utils.mappings import MAPPINGS_DB_PATH, MappingStore
+from utils.matcher import CompetitorMatcher
+from utils.order import Order
+from utils.quote import build_quote
+
+# Расширения файлов спецификаций и тип файла для импорта
+SPEC_FILE_TYPES = {'.xlsx': "excel", '.xls': "excel", '.csv': "csv"}
+
+# Тип спецификации: METEOR (артикулы), другого производителя (наименования) или автоопределение
+KINDS = ("auto", "meteor", "foreign")
+
+SUMMARY_NAME = "Сводка.csv"
+OUTPUT_DIR_NAME = "Расчеты"
+
+SUMMARY_COLUMNS = [
+    "Файл", "Тип", "Статус", "Расчет", "Позиций", "Радиаторов", "Кронштейнов",
+    "Мощность, Вт", "Вес, кг", "Объем, м3", "Сумма, руб (с НДС)", "Не найдено",
+    "Ошибка", "Время, с",
+]
+
+# Каталог и подбор аналогов рабочего процесса (заполняются в _init_worker)
+_worker = {}
+
+
+def find_spec_files(input_dir):
+    """Файлы спецификаций в каталоге (без вложенных), кроме временных файлов Excel"""
+    return sorted(
+        path for path in Path(input_dir).iterdir()
+        if path.is_file() and path.suffix.lower() in SPEC_FILE_TYPES and not path.name.startswith('~$')
+    )
+
+
+def output_names(paths):
+    """Имена файлов расчета: по имени спецификации, а при совпадении имен - с расширением"""
+    stems = Counter(path.stem for path in paths)
+    return [
+        f"{path.stem if stems[path.stem] == 1 else path.name}.xlsx"
+        for path in paths
+    ]
+
+
+def quote_file(path, out_path, catalog, matcher, kind="auto",
+               radiator_discount=0, bracket_discount=0, bracket_type=WALL):
+    """
+    Импорт одной спецификации, подбор кронштейнов и запись расчета в XLSX.
+
+    В режиме "auto" файл сначала читается как спецификация METEOR; если ни
+    один артикул не найден в каталоге, наименования подбираются как
+    спецификация другого производителя. Для нее рядом с расчетом
+    сохраняется таблица соответствия. Возвращает строку сводки (словарь).
+    """
+    path, out_path = Path(path), Path(out_path)
+    file_type = SPEC_FILE_TYPES[path.suffix.lower()]
+    started = time.perf_counter()
+    row = {"Файл": path.name, "Тип": "", "Статус": "ошибка", "Расчет": "", "Ошибка": ""}
+
+    try:
+        order = Order()
+        missing = 0
+        if kind in ("auto", "meteor"):
+            with open(path, 'rb') as source:
+                report = import_meteor_spec(source, file_type, catalog, order)
+            row["Тип"] = "METEOR"
+            missing = len(report.misses)
+
+        if kind == "foreign" or (kind == "auto" and not order):
+            order = Order()
+            with open(path, 'rb') as source:
+                correspondence = match_foreign_spec(source, file_type, matcher, catalog, order)
+            row["Тип"] = "другой производитель"
+            missing = int((correspondence["Артикул Meteor"] == "").sum())
+            if not correspondence.empty:
+                correspondence.to_csv(
+                    out_path.with_suffix(".соответствие.csv"), index=False, sep=';', encoding='utf-8-sig'
+                )
+
+        quote = build_quote(order, catalog, radiator_discount, bracket_discount, bracket_type)
+        row["Не найдено"] = missing
+        if quote.empty:
+            row["Статус"] = "нет позиций"
+        else:
+            out_path.write_bytes(quote.to_xlsx(cache=None))
+            totals = quote.totals
+            row.update({
+                "Статус": "готово",
+                "Расчет": out_path.name,
+                "Позиций": len(quote.spec),
+                "Радиаторов": totals.radiators,
+                "Кронштейнов": totals.brackets,
+                "Мощность, Вт": totals.power,
+                "Вес, кг": totals.weight,
+                "Объем, м3": totals.volume,
+                "Сумма, руб (с НДС)": round(totals.sum, 2),
+            })
+
+    except Exception as e:
+        row["Ошибка"] = f"{type(e).__name__}: {e}"
+
+    row["Время, с"] = round(time.perf_counter() - started, 3)
+    return row
+
+
+def _init_worker(matrix_path, brackets_path, snapshot_path, mappings_path):
+    """Загрузка каталога и подбора аналогов один раз на рабочий процесс"""
+    catalog = load_catalog(matrix_path, brackets_path, snapshot_path)
+    store = MappingStore(mappings_path, json_path=None) if mappings_path else None
+    _worker['catalog'] = catalog
+    _worker['matcher'] = CompetitorMatcher(catalog, store)
+
+
+def _quote_in_worker(path, out_path, kind, radiator_discount, bracket_discount, bracket_type):
+    return quote_file(
+        path, out_path, _worker['catalog'], _worker['matcher'], kind,
+        radiator_discount, bracket_discount, bracket_type,
+    )
+
+
+def run_batch(input_dir, output_dir=None, workers=None, kind="auto",
+              radiator_discount=0, bracket_discount=0, bracket_type=WALL,
+              matrix_path=MATRIX_PATH, brackets_path=BRACKETS_PATH,
+              snapshot_path=SNAPSHOT_PATH, mappings_path=MAPPINGS_DB_PATH, progress=None):
+    """
+    Расчеты для всех спецификаций каталога input_dir параллельно.
+
+    Файлы обрабатываются в пуле процессов; каждый процесс один раз
+    загружает каталог (из снимка, который заранее обновляет родительский
+    процесс) и открывает хранилище соответствий. progress(готово, всего,
+    строка сводки) вызывается по мере завершения файлов. Возвращает
+    таблицу сводки в порядке файлов, она же сохраняется в Сводка.csv.
+    """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir) if output_dir else input_dir / OUTPUT_DIR_NAME
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    paths = find_spec_files(input_dir)
+    out_paths = [output_dir / name for name in output_names(paths)]
+
+    # Снимок каталога и база соответствий создаются до запуска процессов
+    load_catalog(matrix_path, brackets_path, snapshot_path)
+    if mappings_path:
+        MappingStore(mappings_path).close()
+
+    rows = [None] * len(paths)
+    workers = workers or os.cpu_count() or 1
+    if paths:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(paths)),
+            initializer=_init_worker,
+            initargs=(matrix_path, brackets_path, snapshot_path, mappings_path),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _quote_in_worker, path, out_path, kind,
+                    radiator_discount, bracket_discount, bracket_type,
+                ): i
+                for i, (path, out_path) in enumerate(zip(paths, out_paths))
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                rows[i] = future.result()
+                if progress is not None:
+                    progress(done, len(paths), rows[i])
+
+    summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+    summary.to_csv(output_dir / SUMMARY_NAME, index=False, sep=';', encoding='utf-8-sig')
+    return summary
+
+
+def main(argv=None):
+    """Пакетный расчет спецификаций из командной строки"""
+    parser = argparse.ArgumentParser(
+        description="Расчеты METEOR для каталога спецификаций (METEOR и других производителей)"
+    )
+    parser.add_argument('input_dir', help="каталог со спецификациями xlsx/csv")
+    parser.add_argument('-o', '--output', help=f"каталог расчетов (по умолчанию <input_dir>/{OUTPUT_DIR_NAME})")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    parser.add_argument('--kind', choices=KINDS, default="auto", help="тип спецификаций")
+    parser.add_argument('--radiator-discount', type=float, default=0.0, help="скидка на радиаторы, %%")
+    parser.add_argument('--bracket-discount', type=float, default=0.0, help="скидка на кронштейны, %%")
+    parser.add_argument('--mount', choices=BRACKET_TYPES, default=WALL, help="тип крепления")
+    parser.add_argument('--matrix', default=str(MATRIX_PATH), help="путь к Матрица.xlsx")
+    parser.add_argument('--brackets', default=str(BRACKETS_PATH), help="путь к Кронштейны.xlsx")
+    parser.add_argument('--snapshot', default=str(SNAPSHOT_PATH), help="путь к файлу снимка каталога")
+    parser.add_argument('--mappings', default=str(MAPPINGS_DB_PATH),
+                        help="база соответствий конкурентов ('' - без нее)")
+    args = parser.parse_args(argv)
+
+    def report(done, total, row):
+        print(f"[{done}/{total}] {row['Файл']}: {row['Статус']} {row['Ошибка']}".rstrip())
+
+    started = time.perf_counter()
+    summary = run_batch(
+        args.input_dir, args.output, args.workers, args.kind,
+        args.radiator_discount, args.bracket_discount, args.mount,
+        args.matrix, args.brackets, args.snapshot, args.mappings or None, progress=report,
+    )
+    elapsed = time.perf_counter() - started
+
+    ready = int((summary["Статус"] == "готово").sum())
+    errors = int((summary["Статус"] == "ошибка").sum())
+    output_dir = Path(args.output) if args.output else Path(args.input_dir) / OUTPUT_DIR_NAME
+    print(
+        f"Готово расчетов: {ready} из {len(summary)}, ошибок: {errors}, "
+        f"время: {elapsed:.1f} с. Сводка: {output_dir / SUMMARY_NAME}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# utils/brackets.py
+from functools import lru_cache
+
+import pandas as pd
+
+WALL = "Настенные кронштейны"
+FLOOR = "Напольные кронштейны"
+NO_BRACKETS = "Без кронштейнов"
+
+BRACKET_TYPES = [WALL, FLOOR, NO_BRACKETS]
+
+# Без ограничения по размеру
+ANY = (1, 100_000)
+
+# Правила подбора кронштейнов:
+# (тип крепления, типы радиаторов, диапазон высот, диапазон длин, артикул, штук на радиатор)
+# Диапазоны включают границы. Порядок правил задает порядок строк в спецификации.
+BRACKET_RULES = [
+    # Настенные: однорядные радиаторы
+    (WALL, ("10", "11"), ANY, ANY, "К9.2L", 2),
+    (WALL, ("10", "11"), ANY, ANY, "К9.2R", 2),
+    (WALL, ("10", "11"), ANY, (1700, 2000), "К9.3-40", 1),
+
+    # Настенные: многорядные радиаторы, артикул зависит от высоты
+    *[
+        (WALL, ("20", "21", "22", "30", "33"), (height, height), lengths, f"К15.4{height}", count)
+        for height in (300, 400, 500, 600, 900)
+        for lengths, count in (((400, 1600), 2), ((1700, 2000), 3))
+    ],
+
+    # Напольные: однорядные радиаторы
+    (FLOOR, ("10", "11"), (300, 400), ANY, "КНС450", 2),
+    (FLOOR, ("10", "11"), (500, 600), ANY, "КНС470", 2),
+    (FLOOR, ("10", "11"), (900, 900), ANY, "КНС4100", 2),
+    (FLOOR, ("10", "11"), (300, 600), (1700, 2000), "КНС430", 1),
+    (FLOOR, ("10", "11"), (900, 900), (1700, 2000), "КНС430", 1),
+
+    # Напольные: многорядные радиаторы
+    *[
+        (FLOOR, types, heights, lengths, f"{prefix}{suffix}", count)
+        for types, prefix in ((("21",), "КНС6"), (("20", "22", "30", "33"), "КНС5"))
+        for heights, suffix in (((300, 400), "50"), ((500, 600), "70"), ((900, 900), "100"))
+        for lengths, count in (((400, 1000), 2), ((1100, 1600), 3), ((1700, 2000), 4))
+    ],
+]
+
+
+def compile_rules(rules=BRACKET_RULES):
+    """Разворачивает правила в таблицу: одна строка на тип радиатора"""
+    rows = []
+    for mount, types, heights, lengths, art, count in rules:
+        for rad_type in types:
+            rows.append((mount, rad_type, heights[0], heights[1], lengths[0], lengths[1], art, count))
+    return pd.DataFrame(rows, columns=[
+        'Крепление', 'Тип', 'Высота от', 'Высота до', 'Длина от', 'Длина до',
+        'Кронштейн', 'На радиатор'
+    ])
+
+
+RULES_TABLE = compile_rules()
+
+
+@lru_cache(maxsize=None)
+def _cached_plan(bracket_type, radiator_type, height, length):
+    return tuple(
+        (art, count)
+        for mount, types, (h_min, h_max), (l_min, l_max), art, count in BRACKET_RULES
+        if mount == bracket_type and radiator_type in types
+        and h_min <= height <= h_max and l_min <= length <= l_max
+    )
+
+
+def bracket_plan(bracket_type, radiator_type, height, length):
+    """
+    Кронштейны для одного радиатора: кортеж пар (артикул, количество).
+
+    Результат зависит только от (крепление, тип, высота, длина), поэтому
+    запоминается: правила для каждого типоразмера вычисляются один раз.
+    """
+    return _cached_plan(bracket_type, str(radiator_type), int(height), int(length))
+
+
+def expand_brackets(lines, bracket_type):
+    """
+    Потребность в кронштейнах для всего заказа одним вызовом.
+
+    lines - строки заказа (объекты с полями item и qty).
+    Возвращает словарь артикул -> количество в порядке первого появления.
+    """
+    totals = {}
+    for line in lines:
+        item = line.item
+        for art, count in bracket_plan(bracket_type, item.rad_type, item.height, item.length):
+            totals[art] = totals.get(art, 0) + count * line.qty
+    return totals
+
+
+def bracket_needs(lines, bracket_type):
+    """
+    Потребность в кронштейнах для всего заказа одним объединением с таблицей правил.
+
+    lines - строки заказа со столбцами 'Тип', 'Высота', 'Длина', 'Кол-во'.
+    Возвращает таблицу 'Артикул', 'Кол-во' в порядке строк заказа и правил.
+    """
+    rules = RULES_TABLE[RULES_TABLE['Крепление'] == bracket_type]
+    if rules.empty or lines.empty:
+        return pd.DataFrame({'Артикул': pd.Series(dtype=object), 'Кол-во': pd.Series(dtype='int64')})
+
+    merged = lines[['Тип', 'Высота', 'Длина', 'Кол-во']].merge(rules, on='Тип', how='inner', sort=False)
+    merged = merged[
+        merged['Высота'].between(merged['Высота от'], merged['Высота до'])
+        & merged['Длина'].between(merged['Длина от'], merged['Длина до'])
+    ]
+    return pd.DataFrame({
+        'Артикул': merged['Кронштейн'].to_numpy(),
+        'Кол-во': (merged['На радиатор'] * merged['Кол-во']).to_numpy(),
+    })
@@ -0,0 +1,316 @@
+# utils/catalog.py
+import argparse
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+
+import pandas as pd
+
+MATRIX_PATH = Path("data/Матрица.xlsx")
+BRACKETS_PATH = Path("data/Кронштейны.xlsx")
+SNAPSHOT_PATH = Path("data/Матрица.snapshot.pkl")
+BRACKETS_SHEET = "Кронштейны"
+
+# Версия формата снимка: увеличивается при изменении нормализации
+SNAPSHOT_VERSION = 1
+
+# Типоразмеры матрицы подбора
+HEIGHTS = [300, 400, 500, 600, 900]
+LENGTHS = list(range(400, 2100, 100))
+
+NUMERIC_COLUMNS = ['Мощность, Вт', 'Вес, кг', 'Объем, м3', 'Цена, руб']
+
+# Высота и длина в наименовании: ".../300/400 ra" или ".../300мм/400мм"
+SIZE_PATTERN = r'/(\d+)(?:мм)?/(\d+)'
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogItem:
+    """Позиция каталога радиаторов"""
+    art: str
+    name: str
+    sheet: str
+    connection: str
+    rad_type: str
+    height: int
+    length: int
+    power: float
+    weight: float
+    volume: float
+    price: float
+
+
+class Catalog:
+    """
+    Каталог METEOR: листы радиаторов и таблица кронштейнов.
+
+    Один экземпляр разделяется всеми сессиями и страницами, поэтому
+    таблицы каталога нельзя изменять на месте - только копировать.
+    """
+
+    def __init__(self, sheets, brackets):
+        self.sheets = MappingProxyType(sheets)
+        self.brackets = brackets
+        self.articles = MappingProxyType(build_article_index(sheets))
+        self.grids = MappingProxyType(build_size_grids(self.articles))
+        self.table = build_catalog_table(self.articles)
+
+    def lookup(self, art, sheet_name=None):
+        """
+        Находит позицию по артикулу за O(1).
+
+        Если указан лист, позиция должна принадлежать ему. Артикулы с
+        подчеркиваниями дополнительно ищутся без них.
+        """
+        art = str(art).strip()
+        item = self.articles.get(art)
+        if item is None and '_' in art:
+            item = self.articles.get(art.replace('_', ''))
+        if item is None or (sheet_name is not None and item.sheet != sheet_name):
+            return None
+        return item
+
+    def find(self, sheet_name, height, length):
+        """Находит позицию листа по высоте и длине за O(1)"""
+        grid = self.grids.get(sheet_name)
+        if grid is None:
+            return None
+        return grid.get((height, length))
+
+
+def normalize_sheet(df):
+    """Приводит лист радиаторов к единому виду: строковые артикулы, числовые колонки"""
+    df = df.copy()
+    df['Артикул'] = df['Артикул'].astype(str).str.strip()
+    df['Наименование'] = df['Наименование'].astype(str)
+
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    sizes = df['Наименование'].str.extract(SIZE_PATTERN)
+    df['Высота'] = pd.to_numeric(sizes[0], errors='coerce').fillna(0).astype(int)
+    df['Длина'] = pd.to_numeric(sizes[1], errors='coerce').fillna(0).astype(int)
+
+    return df
+
+
+def normalize_brackets(df):
+    """Приводит таблицу кронштейнов к единому виду"""
+    df = df.copy()
+    df['Артикул'] = df['Артикул'].astype(str).str.strip()
+    df['Наименование'] = df['Наименование'].astype(str)
+    if 'Цена, руб' in df.columns:
+        df['Цена, руб'] = pd.to_numeric(df['Цена, руб'], errors='coerce').fillna(0)
+    return df
+
+
+def build_article_index(sheets):
+    """Строит индекс артикул -> позиция каталога по всем листам"""
+    index = {}
+    for sheet_name, df in sheets.items():
+        connection, _, rad_type = sheet_name.rpartition(' ')
+        columns = [
+            df[col] if col in df.columns else pd.Series(0, index=df.index)
+            for col in ['Мощность, Вт', 'Вес, кг', 'Объем, м3', 'Цена, руб']
+        ]
+        rows = zip(df['Артикул'], df['Наименование'], df['Высота'], df['Длина'], *columns)
+        for art, name, height, length, power, weight, volume, price in rows:
+            # При дублировании артикула побеждает первый лист, как при поиске по листам
+            if art in index:
+                continue
+            index[art] = CatalogItem(
+                art=art,
+                name=name,
+                sheet=sheet_name,
+                connection=connection,
+                rad_type=rad_type,
+                height=int(height),
+                length=int(length),
+                power=float(power),
+                weight=float(weight),
+                volume=float(volume),
+                price=float(price),
+            )
+    return index
+
+
+def build_catalog_table(articles):
+    """Плоская таблица всех позиций каталога для объединения с заказом"""
+    return pd.DataFrame(
+        [
+            (item.art, item.name, item.sheet, item.connection, item.rad_type, item.height,
+             item.length, item.power, item.weight, item.volume, item.price)
+            for item in articles.values()
+        ],
+        columns=['Артикул', 'Наименование', 'Лист', 'Подключение', 'Тип', 'Высота', 'Длина',
+                 'Мощность, Вт', 'Вес, кг', 'Объем, м3', 'Цена, руб'],
+    )
+
+
+def build_size_grids(articles):
+    """Строит для каждого листа таблицу (высота, длина) -> позиция каталога"""
+    grids = {}
+    for item in articles.values():
+        if not item.height or not item.length:
+            continue
+        # Первая позиция с данным размером, как при поиске по наименованию
+        grids.setdefault(item.sheet, {}).setdefault((item.height, item.length), item)
+    return grids
+
+
+def parse_workbooks(matrix_path=MATRIX_PATH, brackets_path=BRACKETS_PATH):
+    """
+    Разбирает Excel файлы каталога.
+
+    Кронштейны берутся с листа "Кронштейны" матрицы, а если его нет -
+    из отдельного файла. Отсутствующий файл приводит к FileNotFoundError.
+    """
+    matrix_path = Path(matrix_path)
+    brackets_path = Path(brackets_path)
+
+    if not matrix_path.exists():
+        raise FileNotFoundError(2, "Файл не найден", matrix_path.name)
+
+    sheets = pd.read_excel(matrix_path, sheet_name=None, engine="openpyxl")
+
+    if BRACKETS_SHEET in sheets:
+        brackets_df = sheets.pop(BRACKETS_SHEET)
+    elif brackets_path.exists():
+        brackets_df = pd.read_excel(brackets_path, engine="openpyxl")
+    else:
+        raise FileNotFoundError(2, "Файл не найден", brackets_path.name)
+
+    sheets = {name: normalize_sheet(df) for name, df in sheets.items()}
+    return Catalog(sheets, normalize_brackets(brackets_df))
+
+
+def _file_hash(path):
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_stamps(paths):
+    """Отметки исходных файлов: время изменения и размер"""
+    stamps = {}
+    for path in paths:
+        if path.exists():
+            stat = path.stat()
+            stamps[str(path)] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    return stamps
+
+
+def _read_snapshot(snapshot_path, stamps):
+    """
+    Читает снимок, если он соответствует исходным файлам.
+
+    При совпадении времени изменения снимок используется сразу. Если время
+    изменилось (например, после git checkout), сравнивается хеш содержимого.
+    Снимок другой версии формата, поврежденный или неожиданной структуры
+    считается отсутствующим: каталог разбирается из Excel заново.
+    Возвращает (каталог или None, признак что отметки нужно обновить).
+    """
+    try:
+        with open(snapshot_path, 'rb') as f:
+            payload = pickle.load(f)
+        return _catalog_from_snapshot(payload, stamps)
+    except Exception:
+        return None, False
+
+
+def _catalog_from_snapshot(payload, stamps):
+    """Каталог из содержимого снимка; исключение при неожиданной структуре"""
+    if not isinstance(payload, dict) or payload.get('version') != SNAPSHOT_VERSION:
+        return None, False
+
+    saved = payload['sources']
+    if set(saved) != set(stamps):
+        return None, False
+
+    stale = False
+    for path, stamp in stamps.items():
+        saved_stamp = saved[path]
+        if saved_stamp['mtime_ns'] == stamp['mtime_ns'] and saved_stamp['size'] == stamp['size']:
+            continue
+        if saved_stamp['size'] != stamp['size'] or saved_stamp.get('sha256') != _file_hash(path):
+            return None, False
+        stale = True
+
+    return Catalog(payload['sheets'], payload['brackets']), stale
+
+
+def write_snapshot(catalog, snapshot_path, stamps):
+    """Атомарно записывает снимок каталога рядом с исходными файлами"""
+    snapshot_path = Path(snapshot_path)
+    for path, stamp in stamps.items():
+        stamp['sha256'] = _file_hash(path)
+
+    payload = {
+        'version': SNAPSHOT_VERSION,
+        'sources': stamps,
+        'sheets': dict(catalog.sheets),
+        'brackets': catalog.brackets,
+    }
+    tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def load_catalog(matrix_path=MATRIX_PATH, brackets_path=BRACKETS_PATH,
+                 snapshot_path=SNAPSHOT_PATH, use_snapshot=True):
+    """
+    Загружает каталог, используя бинарный снимок если он актуален.
+
+    Снимок пересобирается автоматически при изменении Excel файлов.
+    Ошибки записи снимка (например, файловая система только для чтения)
+    не мешают работе - каталог просто разбирается из Excel.
+    """
+    if not use_snapshot or snapshot_path is None:
+        return parse_workbooks(matrix_path, brackets_path)
+
+    stamps = _source_stamps([Path(matrix_path), Path(brackets_path)])
+    catalog, stale = _read_snapshot(snapshot_path, stamps)
+
+    if catalog is None:
+        catalog = parse_workbooks(matrix_path, brackets_path)
+        stale = True
+
+    if stale:
+        try:
+            write_snapshot(catalog, snapshot_path, stamps)
+        except OSError:
+            pass
+
+    return catalog
+
+
+def main(argv=None):
+    """Сборка снимка каталога из командной строки (например, на этапе docker build)"""
+    parser = argparse.ArgumentParser(description="Сборка бинарного снимка каталога METEOR")
+    parser.add_argument('--matrix', default=str(MATRIX_PATH), help="путь к Матрица.xlsx")
+    parser.add_argument('--brackets', default=str(BRACKETS_PATH), help="путь к Кронштейны.xlsx")
+    parser.add_argument('--snapshot', default=str(SNAPSHOT_PATH), help="путь к файлу снимка")
+    args = parser.parse_args(argv)
+
+    stamps = _source_stamps([Path(args.matrix), Path(args.brackets)])
+    catalog = parse_workbooks(args.matrix, args.brackets)
+    write_snapshot(catalog, args.snapshot, stamps)
+
+    total = sum(len(df) for df in catalog.sheets.values())
+    print(f"Снимок каталога сохранен: {args.snapshot} ({len(catalog.sheets)} листов, {total} позиций)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,67 +2,85 @@
 import pandas as pd
 import os
 
-def create_test_matrix_data():
-    """Создает тестовые данные для матрицы радиаторов"""
-    
-    # Создаем директорию data если её нет
-    os.makedirs('data', exist_ok=True)
-    
+# Комбинации подключения и типа (по листу на комбинацию)
+COMBINATIONS = [
+    ("VK-правое", "10"),
+    ("VK-правое", "11"),
+    ("VK-правое", "20"),
+    ("VK-правое", "21"),
+    ("VK-правое", "22"),
+    ("VK-правое", "30"),
+    ("VK-правое", "33"),
+    ("VK-левое", "10"),
+    ("VK-левое", "11"),
+    ("VK-левое", "30"),
+    ("VK-левое", "33"),
+    ("K-боковое", "10"),
+    ("K-боковое", "11"),
+    ("K-боковое", "20"),
+    ("K-боковое", "21"),
+    ("K-боковое", "22"),
+    ("K-боковое", "30"),
+    ("K-боковое", "33"),
+]
+
+# Код подключения в артикуле: одинаковые типоразмеры разных листов различаются
+CONNECTION_CODES = {"VK-правое": "VR", "VK-левое": "VL", "K-боковое": "K"}
+
+HEIGHTS = [300, 400, 500, 600, 900]
+LENGTHS = list(range(400, 2100, 100))
+
+# Различных артикулов в одной серии (по одному на ячейку каждого листа)
+SERIES_ARTICLES = len(COMBINATIONS) * len(HEIGHTS) * len(LENGTHS)
+
+
+def create_test_matrix_data(path='data/Матрица.xlsx', series=1):
+    """
+    Создает тестовые данные для матрицы радиаторов.
+
+    series - число серий типоразмеров на каждом листе: серии после первой
+    получают артикулы с суффиксом "-N", чтобы каталог можно было увеличить
+    (например, для замеров производительности на больших заказах).
+    """
+
+    # Создаем директорию для файла если её нет
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
     # Создаем Excel файл с несколькими листами
-    with pd.ExcelWriter('data/Матрица.xlsx', engine='openpyxl') as writer:
-        
-        # Создаем данные для разных комбинаций подключения и типа
-        combinations = [
-            ("VK-правое", "10"),
-            ("VK-правое", "11"), 
-            ("VK-правое", "20"),
-            ("VK-правое", "21"),
-            ("VK-правое", "22"),
-            ("VK-правое", "30"),
-            ("VK-правое", "33"),
-            ("VK-левое", "10"),
-            ("VK-левое", "11"),
-            ("VK-левое", "30"),
-            ("VK-левое", "33"),
-            ("K-боковое", "10"),
-            ("K-боковое", "11"),
-            ("K-боковое", "20"),
-            ("K-боковое", "21"),
-            ("K-боковое", "22"),
-            ("K-боковое", "30"),
-            ("K-боковое", "33"),
-        ]
-        
-        heights = [300, 400, 500, 600, 900]
-        lengths = list(range(400, 2100, 100))
-        
-        for connection, rad_type in combinations:
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+
+        for connection, rad_type in COMBINATIONS:
             sheet_data = []
-            
-            for height in heights:
-                for length in lengths:
-                    # Создаем тестовые данные для каждого размера
-                    articul = f"R{rad_type}{height}{length}"
-                    name = f"Радиатор METEOR тип {rad_type}/{height}мм/{length}мм"
-                    power = length * 0.5 + height * 0.3  # Пример расчета мощности
-                    weight = length * 0.01 + height * 0.005  # Пример расчета веса
-                    volume = length * height * 0.000001  # Пример расчета объема
-                    price = length * 2 + height * 1  # Пример расчета цены
-                    
-                    sheet_data.append({
-                        'Артикул': articul,
-                        'Наименование': name,
-                        'Мощность, Вт': round(power, 1),
-                        'Вес, кг': round(weight, 2),
-                        'Объем, м3': round(volume, 4),
-                        'Цена, руб': round(price, 2)
-                    })
-            
+
+            for number in range(series):
+                suffix = f"-{number}" if number else ""
+                for height in HEIGHTS:
+                    for length in LENGTHS:
+                        # Создаем тестовые данные для каждого размера
+                        articul = f"R{CONNECTION_CODES[connection]}{rad_type}{height}{length}{suffix}"
+                        name = f"Радиатор METEOR тип {rad_type}/{height}мм/{length}мм"
+                        if number:
+                            name += f" серия {number}"
+                        power = length * 0.5 + height * 0.3  # Пример расчета мощности
+                        weight = length * 0.01 + height * 0.005  # Пример расчета веса
+                        volume = length * height * 0.000001  # Пример расчета объема
+                        price = length * 2 + height * 1  # Пример расчета цены
+
+                        sheet_data.append({
+                            'Артикул': articul,
+                            'Наименование': name,
+                            'Мощность, Вт': round(power, 1),
+                            'Вес, кг': round(weight, 2),
+                            'Объем, м3': round(volume, 4),
+                            'Цена, руб': round(price, 2)
+                        })
+
             df = pd.DataFrame(sheet_data)
             sheet_name = f"{connection} {rad_type}"
             df.to_excel(writer, sheet_name=sheet_name, index=False)
-    
-    print("Тестовые данные созданы успешно!")
+
+    return path
 
 if __name__ == "__main__":
-    create_test_matrix_data()
\ No newline at end of file
+    create_test_matrix_data()
+    print("Тестовые данные созданы успешно!")
@@ -2,6 +2,36 @@ import streamlit as st
 import pandas as pd
 import os
 
+from utils.catalog import load_catalog
+from utils.mappings import MappingStore
+from utils.matcher import CompetitorMatcher
+
+
+@st.cache_resource(show_spinner="Загрузка каталога...")
+def _load_shared_catalog():
+    """Каталог загружается один раз на процесс и разделяется всеми сессиями"""
+    return load_catalog()
+
+
+def get_catalog():
+    """Возвращает общий каталог, останавливая страницу если файлов данных нет"""
+    try:
+        return _load_shared_catalog()
+    except FileNotFoundError as e:
+        st.error(f"❌ Файл '{e.filename}' не найден")
+        st.stop()
+
+
+@st.cache_resource
+def _load_shared_matcher(_catalog):
+    """Подбор аналогов строится один раз на процесс над общим хранилищем соответствий"""
+    return CompetitorMatcher(_catalog, MappingStore())
+
+
+def get_matcher():
+    """Возвращает общий подбор аналогов конкурентов"""
+    return _load_shared_matcher(get_catalog())
+
 @st.cache_data
 def load_radiator_data(sheet_name):
     """Загружает данные радиаторов из Excel файла"""
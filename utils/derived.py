@@ -0,0 +1,129 @@
+# utils/derived.py
+import pandas as pd
+
+from utils.brackets import BRACKET_TYPES, bracket_needs, bracket_plan
+from utils.specification import (
+    assemble_spec, order_frame, price_brackets, price_radiators, spec_totals
+)
+
+
+class OrderState:
+    """
+    Производные данные заказа одной сессии с пересчетом по зависимостям.
+
+    Строки выбранных позиций и потребность в кронштейнах для каждого типа
+    крепления обновляются по журналу заказа (Order.changes_since): изменение
+    одной ячейки пересчитывает только ее строку и вклад в кронштейны.
+    Остальные узлы (спецификация, итоги, таблицы страниц) запоминаются вместе
+    с ключом своих зависимостей и пересчитываются, только когда ключ изменился.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.hits = 0
+        self.misses = 0
+        self._reset(None)
+
+    def sync(self, order):
+        """Учитывает изменения заказа с прошлого вызова"""
+        changes = order.changes_since(self._position) if order is self._order else None
+        if changes is None:
+            self._reset(order)
+            changes = list(order.entries())
+
+        # Строка, измененная несколько раз, учитывается один раз на месте последнего изменения
+        for art in reversed(list(dict.fromkeys(reversed(changes)))):
+            self._update(order, art)
+        self._position = order.journal_position()
+
+    def selected_items(self, order):
+        """Выбранные позиции: словари по строкам заказа в порядке ввода"""
+        self.sync(order)
+        return list(self._rows.values())
+
+    def bracket_totals(self, order, bracket_type):
+        """Потребность в кронштейнах: словарь артикул -> количество"""
+        self.sync(order)
+        return dict(self._brackets.get(bracket_type, {}))
+
+    def memo(self, name, key, compute):
+        """Значение узла name: compute() вызывается, только если изменился ключ зависимостей"""
+        node = self._nodes.get(name)
+        if node is not None and node[0] == key:
+            self.hits += 1
+            return node[1]
+        self.misses += 1
+        value = compute()
+        self._nodes[name] = (key, value)
+        return value
+
+    def spec(self, order, brackets_df, radiator_discount, bracket_discount, bracket_type):
+        """
+        Спецификация и ее итоги (как prepare_spec_data).
+
+        Скидка на радиаторы пересчитывает только строки радиаторов, скидка на
+        кронштейны и тип крепления - только строки кронштейнов.
+        """
+        self.sync(order)
+        version = order.version
+        radiator_discount = float(radiator_discount or 0)
+        bracket_discount = float(bracket_discount or 0)
+
+        lines = self.memo('lines', version, lambda: order_frame(order, self.catalog))
+        if lines.empty:
+            return pd.DataFrame(), None
+
+        radiators = self.memo(
+            'radiators', (version, radiator_discount),
+            lambda: price_radiators(lines, radiator_discount),
+        )
+        needs = self.memo('needs', (version, bracket_type), lambda: bracket_needs(lines, bracket_type))
+        brackets = self.memo(
+            'brackets', (version, bracket_type, bracket_discount),
+            lambda: price_brackets(needs, brackets_df, bracket_discount),
+        )
+
+        def build():
+            spec_data = assemble_spec(radiators, brackets)
+            return spec_data, spec_totals(lines, spec_data)
+
+        return self.memo('spec', (version, radiator_discount, bracket_discount, bracket_type), build)
+
+    def _reset(self, order):
+        self._order = order
+        self._position = None
+        self._lines = {}
+        self._rows = {}
+        self._brackets = {mount: {} for mount in BRACKET_TYPES}
+        self._nodes = {}
+
+    def _update(self, order, art):
+        """Пересчитывает одну строку заказа и ее вклад в кронштейны"""
+        old = self._lines.pop(art, None)
+        self._rows.pop(art, None)
+        line = order.line(art)
+        if line is not None and line.qty > 0:
+            self._lines[art] = line
+            self._rows[art] = {
+                'Артикул': line.item.art,
+                'Наименование': line.item.name,
+                'Количество': line.qty,
+                'Вес, кг': line.item.weight,
+                'Лист': line.item.sheet,
+            }
+        else:
+            line = None
+
+        if old is not None:
+            self._add_brackets(old.item, -old.qty)
+        if line is not None:
+            self._add_brackets(line.item, line.qty)
+
+    def _add_brackets(self, item, qty):
+        for mount, totals in self._brackets.items():
+            for art, count in bracket_plan(mount, item.rad_type, item.height, item.length):
+                total = totals.get(art, 0) + count * qty
+                if total:
+                    totals[art] = total
+                else:
+                    del totals[art]
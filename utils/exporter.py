@@ -1,61 +1,259 @@
 # utils/exporter.py
+import hashlib
+import threading
+from collections import OrderedDict
+
 import pandas as pd
-import streamlit as st
 from io import BytesIO
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+from openpyxl.utils import get_column_letter
+
+from utils.specification import SPEC_COLUMNS
+
+# Ширина столбцов спецификации как в эталоне
+SPEC_COLUMN_WIDTHS = [8, 15, 60, 12, 15, 10, 20, 10, 18]
+
+# Числовые форматы столбцов спецификации (None - текст)
+SPEC_NUMBER_FORMATS = [None, None, None, '0', '#,##0.00', '0', '#,##0.00', '0', '#,##0.00']
+
+# Предельный суммарный размер кэша готовых файлов
+EXPORT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class ExportCache:
+    """
+    LRU-кэш готовых файлов экспорта, общий для всех сессий процесса.
+
+    Размер ограничен суммой длин файлов: при переполнении вытесняются
+    давно не использованные. Доступ защищен блокировкой, так как сессии
+    Streamlit выполняются в разных потоках.
+    """
+
+    def __init__(self, max_bytes=EXPORT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    @property
+    def size(self):
+        """Суммарный размер файлов в кэше, байт"""
+        return self._size
+
+    def get(self, key):
+        """Готовый файл по ключу или None"""
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        """Сохраняет файл; слишком большие файлы не кэшируются"""
+        if data is None or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get_or_build(self, key, build):
+        """Возвращает файл из кэша, а при промахе строит его вызовом build()"""
+        data = self.get(key)
+        if data is None:
+            data = build()
+            self.put(key, data)
+        return data
+
+    def clear(self):
+        """Очищает кэш"""
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+
+EXPORT_CACHE = ExportCache()
+
+
+def spec_export_key(fingerprint, radiator_discount, bracket_discount, bracket_type, kind="xlsx"):
+    """Ключ кэша экспорта спецификации: отпечаток заказа (Order.fingerprint), скидки и тип крепления"""
+    return (
+        kind,
+        fingerprint,
+        float(radiator_discount or 0),
+        float(bracket_discount or 0),
+        bracket_type,
+    )
+
+
+def frame_fingerprint(df):
+    """Хеш содержимого DataFrame вместе с названиями столбцов"""
+    digest = hashlib.sha256()
+    digest.update("\t".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _spec_styles():
+    """Именованные стили спецификации: один объект стиля на книгу, а не на ячейку"""
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    center = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    return [
+        NamedStyle(name='spec_header', font=Font(bold=True, size=10, name='Arial'),
+                   alignment=center, border=border),
+        NamedStyle(name='spec_cell', font=Font(size=10, name='Arial'),
+                   alignment=center, border=border),
+        NamedStyle(name='spec_total', font=Font(bold=True, size=10, name='Arial'),
+                   alignment=center, border=border),
+        NamedStyle(name='spec_info', font=Font(size=10, name='Arial'),
+                   alignment=Alignment(horizontal='left', vertical='center')),
+    ]
+
+
+def _to_number(value):
+    """Число из значения ячейки; пустые и нечисловые значения возвращаются как есть"""
+    if value is None or value == "" or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, str):
+        try:
+            return float(value.replace(',', '.').replace(' ', ''))
+        except ValueError:
+            return value
+    return value
+
+
+def write_spec_xlsx(output, spec_data_with_total, total_weight, total_volume):
+    """
+    Записывает спецификацию в поток output в режиме write_only.
+
+    Строки пишутся по одной без хранения листа в памяти, стили - общие
+    именованные, числа записываются числовыми ячейками с форматом.
+    """
+    wb = Workbook(write_only=True)
+    for style in _spec_styles():
+        wb.add_named_style(style)
+
+    ws = wb.create_sheet("Спецификация")
+    for col_num, width in enumerate(SPEC_COLUMN_WIDTHS, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+
+    def make_cell(value, style, number_format=None):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        if number_format and isinstance(value, (int, float)):
+            cell.number_format = number_format
+        return cell
+
+    ws.append([make_cell(header, 'spec_header') for header in SPEC_COLUMNS])
+
+    columns = [spec_data_with_total[col].tolist() for col in SPEC_COLUMNS]
+    for values in zip(*columns):
+        style = 'spec_total' if str(values[0]) == "Итого" else 'spec_cell'
+        row = []
+        for value, number_format in zip(values, SPEC_NUMBER_FORMATS):
+            if number_format is not None:
+                value = _to_number(value)
+            elif value is not None and not isinstance(value, (int, float)):
+                value = str(value)
+            row.append(make_cell(value, style, number_format))
+        ws.append(row)
+
+    # Пустая строка, затем вес и объем в объединенных ячейках как в эталоне
+    last_row = len(spec_data_with_total) + 3
+    ws.append([])
+    ws.append([make_cell(
+        f"Суммарный вес радиаторов без учета упаковки и кронштейнов- {total_weight} кг.", 'spec_info')])
+    ws.append([make_cell(
+        f"Суммарный объем радиаторов без учета упаковки и кронштейнов- {total_volume} м3.", 'spec_info')])
+    last_col = get_column_letter(len(SPEC_COLUMNS))
+    ws.merged_cells.add(f'A{last_row}:{last_col}{last_row}')
+    ws.merged_cells.add(f'A{last_row + 1}:{last_col}{last_row + 1}')
+
+    wb.save(output)
+
+
+def create_excel_file(spec_data_with_total, total_power, total_weight, total_volume, total_sum):
+    """
+    Создает Excel файл спецификации и возвращает байты.
+
+    Ошибки записи передаются вызывающему коду: страница показывает их
+    пользователю, пакетная обработка - записывает в отчет.
+    """
+    buffer = BytesIO()
+    write_spec_xlsx(buffer, spec_data_with_total, total_weight, total_volume)
+    return buffer.getvalue()
+
+
+def column_widths(df, limit=50):
+    """Ширина столбцов по самому длинному значению, посчитанная по столбцам целиком"""
+    widths = []
+    for col in df.columns:
+        length = len(str(col))
+        if len(df):
+            length = max(length, int(df[col].astype(str).str.len().max()))
+        widths.append(min(length + 2, limit))
+    return widths
+
 
 def export_to_excel(df, filename=None):
     """Экспорт DataFrame в Excel с форматированием согласно ТЗ"""
-    
+
     if filename is None:
         filename = f"спецификация_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    
-    try:
-        output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Лист "Спецификация"
-            df.to_excel(writer, sheet_name='Спецификация', index=False)
-            
-            # Настройка форматирования
-            workbook = writer.book
-            worksheet = writer.sheets['Спецификация']
-            
-            # Автоподбор ширины столбцов
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-            
-            # Добавление итоговой строки
-            total_row = len(df) + 2
-            worksheet.cell(row=total_row, column=1, value="ИТОГО:")
-            worksheet.cell(row=total_row, column=4, value=df['Количество'].sum())
-            worksheet.cell(row=total_row, column=6, value=df['Сумма'].sum())
-        
-        return output.getvalue(), filename
-        
-    except Exception as e:
-        st.error(f"❌ Ошибка экспорта: {e}")
-        return None, None
+
+    key = ("table_xlsx", frame_fingerprint(df))
+    return EXPORT_CACHE.get_or_build(key, lambda: _table_xlsx(df)), filename
+
+
+def _table_xlsx(df):
+    """Байты XLSX с таблицей df и итоговой строкой"""
+    output = BytesIO()
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Спецификация')
+
+    # Автоподбор ширины столбцов
+    for col_num, width in enumerate(column_widths(df), 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+
+    ws.append([str(col) for col in df.columns])
+    for row in df.itertuples(index=False, name=None):
+        ws.append([None if pd.isna(value) else value for value in row])
+
+    # Добавление итоговой строки
+    total_row = [None] * max(len(df.columns), 6)
+    total_row[0] = "ИТОГО:"
+    total_row[3] = df['Количество'].sum()
+    total_row[5] = df['Сумма'].sum()
+    ws.append(total_row)
+
+    wb.save(output)
+    return output.getvalue()
+
 
 def export_to_csv(df, filename=None):
     """Экспорт в CSV согласно ТЗ"""
-    
+
     if filename is None:
         filename = f"спецификация_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.csv"
-    
-    try:
-        # CSV с разделителем точка с запятой и кодировкой UTF-8-sig
-        output = df.to_csv(index=False, sep=';', encoding='utf-8-sig')
-        return output.encode('utf-8-sig'), filename
-        
-    except Exception as e:
-        st.error(f"❌ Ошибка экспорта CSV: {e}")
-        return None, None
\ No newline at end of file
+
+    # CSV с разделителем точка с запятой и кодировкой UTF-8-sig
+    key = ("table_csv", frame_fingerprint(df))
+    data = EXPORT_CACHE.get_or_build(
+        key, lambda: df.to_csv(index=False, sep=';').encode('utf-8-sig')
+    )
+    return data, filename
\ No newline at end of file
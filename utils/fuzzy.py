@@ -0,0 +1,236 @@
+# utils/fuzzy.py
+import re
+from collections import Counter
+
+import numpy as np
+
+# Длина символьных n-грамм
+NGRAM = 3
+
+# N-граммы, встречающиеся в большей доле документов, не участвуют в поиске
+MAX_DF = 0.5
+
+# N-граммы с более длинным списком документов не участвуют в поиске
+MAX_POSTINGS = 2_000
+
+# Сколько самых информативных n-грамм запроса учитывается
+MAX_QUERY_TERMS = 32
+
+# Сколько пар (запрос, документ) обрабатывается за одну пачку
+PAIR_BLOCK = 4_000_000
+
+# Предельный размер плотной матрицы оценок одной пачки (элементов)
+SCORE_BLOCK = 4_000_000
+
+_NON_WORD = re.compile(r'[^0-9a-zа-яё]+')
+
+
+def fuzzy_text(name):
+    """Текст для n-грамм: нижний регистр, только буквы и цифры через пробел"""
+    return " " + _NON_WORD.sub(" ", str(name).lower().replace("ё", "е")).strip() + " "
+
+
+def ngrams(name, n=NGRAM):
+    """Символьные n-граммы наименования"""
+    text = fuzzy_text(name)
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+class FuzzyIndex:
+    """
+    Нечеткий поиск по символьным n-граммам (TF-IDF, косинусная близость).
+
+    Документы - наименования с меткой (артикул METEOR). Векторы документов
+    хранятся нормированными по tf, а idf применяется к запросу по текущим
+    частотам, поэтому добавление документов не требует пересчета старых.
+    Поиск идет пачками запросов через инвертированный индекс на NumPy.
+    """
+
+    def __init__(self, n=NGRAM):
+        self.n = n
+        self.vocab = {}
+        self.labels = []
+        self._df = np.zeros(0, dtype=np.int64)
+        self._terms = []
+        self._docs = []
+        self._weights = []
+        self._postings = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, names, labels):
+        """Добавляет документы: наименования и их метки"""
+        names = list(names)
+        labels = list(labels)
+        first = len(self.labels)
+        terms, docs, weights = self._vectorize(names, grow=True)
+        if not len(terms):
+            self.labels.extend(labels)
+            return
+
+        self._terms.append(terms)
+        self._docs.append(docs + first)
+        self._weights.append(weights)
+        self.labels.extend(labels)
+        self._df += np.bincount(terms, minlength=len(self._df))
+        # Инвертированный индекс пересобирается при следующем поиске
+        self._postings = None
+
+    def search(self, name, k=5):
+        """Лучшие метки для одного наименования: список пар (метка, близость)"""
+        return self.search_many([name], k)[0]
+
+    def search_many(self, names, k=5):
+        """
+        Лучшие метки для каждого наименования пачкой.
+
+        Возвращает список списков пар (метка, близость) по убыванию
+        близости; одна метка встречается в списке не более одного раза.
+        """
+        names = list(names)
+        results = [[] for _ in names]
+        if not names or not self.labels:
+            return results
+
+        p_term, p_doc, p_weight, starts, ends = self._index()
+        q_terms, q_rows, q_weights = self._queries(names)
+        if not len(q_terms):
+            return results
+
+        n_docs = len(self.labels)
+        labels = np.asarray(self.labels, dtype=object)
+        depth = min(n_docs, k * 4)
+
+        for first, last in self._blocks(q_rows, ends[q_terms] - starts[q_terms], len(names), n_docs):
+            mask = (q_rows >= first) & (q_rows < last)
+            rows, terms, weights = q_rows[mask] - first, q_terms[mask], q_weights[mask]
+
+            # Пары (запрос, документ) по спискам документов каждой n-граммы
+            lengths = ends[terms] - starts[terms]
+            total = int(lengths.sum())
+            if not total:
+                continue
+            offsets = np.repeat(starts[terms] - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+            pairs = np.repeat(rows, lengths) * n_docs + p_doc[offsets]
+            values = np.repeat(weights, lengths) * p_weight[offsets]
+
+            if (last - first) * n_docs <= 4 * total:
+                top_rows, top_docs, top_scores = _dense_top(pairs, values, last - first, n_docs, depth)
+            else:
+                top_rows, top_docs, top_scores = _sparse_top(pairs, values, n_docs, depth)
+
+            for row, doc, score in zip(top_rows.tolist(), top_docs.tolist(), top_scores.tolist()):
+                found = results[first + row]
+                label = labels[doc]
+                if score <= 0 or len(found) >= k or any(label == seen for seen, _ in found):
+                    continue
+                found.append((label, round(score, 4)))
+
+        return results
+
+    @staticmethod
+    def _blocks(rows, lengths, n_queries, n_docs):
+        """Границы пачек запросов: ограничены число пар и размер плотной матрицы"""
+        pairs_per_row = np.bincount(rows, weights=lengths, minlength=n_queries)
+        max_rows = max(1, SCORE_BLOCK // n_docs)
+        first = 0
+        while first < n_queries:
+            cumulative = np.cumsum(pairs_per_row[first:first + max_rows])
+            last = first + max(1, int(np.searchsorted(cumulative, PAIR_BLOCK, side='right')))
+            yield first, last
+            first = last
+
+    def _vectorize(self, names, grow):
+        """Разреженные векторы tf: тройки (n-грамма, номер строки, вес)"""
+        terms, rows, weights = [], [], []
+        for row, name in enumerate(names):
+            counts = Counter(ngrams(name, self.n))
+            ids, tf = [], []
+            for gram, count in counts.items():
+                term = self.vocab.get(gram)
+                if term is None:
+                    if not grow:
+                        continue
+                    term = self.vocab[gram] = len(self.vocab)
+                ids.append(term)
+                tf.append(1.0 + np.log(count))
+            if not ids:
+                continue
+            tf = np.asarray(tf)
+            terms.extend(ids)
+            rows.extend([row] * len(ids))
+            weights.extend(tf / np.linalg.norm(tf))
+
+        if grow and len(self.vocab) > len(self._df):
+            self._df = np.concatenate([self._df, np.zeros(len(self.vocab) - len(self._df), dtype=np.int64)])
+        return (
+            np.asarray(terms, dtype=np.int64),
+            np.asarray(rows, dtype=np.int64),
+            np.asarray(weights, dtype=float),
+        )
+
+    def _queries(self, names):
+        """Векторы запросов с весами tf-idf по текущим частотам n-грамм"""
+        terms, rows, weights = self._vectorize(names, grow=False)
+        if not len(terms):
+            return terms, rows, weights
+
+        n_docs = len(self.labels)
+        df = self._df[terms]
+        keep = (df > 0) & (df <= max(1, MAX_DF * n_docs)) & (df <= MAX_POSTINGS)
+        terms, rows, weights = terms[keep], rows[keep], weights[keep]
+        weights = weights * (np.log((1 + n_docs) / (1 + self._df[terms])) + 1.0)
+
+        # Для каждого запроса - только самые информативные n-граммы
+        order = np.lexsort((-weights, rows))
+        terms, rows, weights = terms[order], rows[order], weights[order]
+        keep = _rank_within(rows) < MAX_QUERY_TERMS
+        terms, rows, weights = terms[keep], rows[keep], weights[keep]
+
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(names)))
+        return terms, rows, weights / norms[rows]
+
+    def _index(self):
+        """Инвертированный индекс: документы, отсортированные по n-грамме"""
+        if self._postings is None:
+            terms = np.concatenate(self._terms) if self._terms else np.zeros(0, dtype=np.int64)
+            docs = np.concatenate(self._docs) if self._docs else np.zeros(0, dtype=np.int64)
+            weights = np.concatenate(self._weights) if self._weights else np.zeros(0)
+            order = np.argsort(terms, kind='stable')
+            terms, docs, weights = terms[order], docs[order], weights[order]
+            self._terms, self._docs, self._weights = [terms], [docs], [weights]
+
+            vocab = np.arange(len(self.vocab))
+            starts = np.searchsorted(terms, vocab, side='left')
+            ends = np.searchsorted(terms, vocab, side='right')
+            self._postings = (terms, docs, weights, starts, ends)
+        return self._postings
+
+
+def _rank_within(rows):
+    """Порядковый номер элемента внутри группы одинаковых (отсортированных) rows"""
+    return np.arange(len(rows)) - np.searchsorted(rows, rows, side='left')
+
+
+def _dense_top(pairs, values, n_rows, n_docs, depth):
+    """Лучшие документы каждого запроса через плотную матрицу оценок"""
+    scores = np.bincount(pairs, weights=values, minlength=n_rows * n_docs).reshape(n_rows, n_docs)
+    top = np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    top_rows = np.repeat(np.arange(n_rows), depth)
+    return top_rows, top.ravel(), top_scores.ravel()
+
+
+def _sparse_top(pairs, values, n_docs, depth):
+    """Лучшие документы каждого запроса по сумме оценок только ненулевых пар"""
+    pairs, inverse = np.unique(pairs, return_inverse=True)
+    scores = np.bincount(inverse, weights=values)
+    rows, docs = pairs // n_docs, pairs % n_docs
+    order = np.lexsort((-scores, rows))
+    rows, docs, scores = rows[order], docs[order], scores[order]
+    top = _rank_within(rows) < depth
+    return rows[top], docs[top], scores[top]
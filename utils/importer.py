@@ -0,0 +1,317 @@
+# utils/importer.py
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Ключевые слова заголовков столбцов
+ART_PATTERN = r'артикул|art|код'
+NAME_PATTERN = r'наименование|name|описание'
+QTY_PATTERN = r'кол-во|количество|qty'
+
+# Строки спецификаций конкурентов, которые относятся к радиаторам
+RADIATOR_PATTERN = r'радиатор|radiator|k-profil|vk-profil'
+
+# Сколько строк с начала таблицы просматривается в поисках заголовка
+HEADER_SCAN_ROWS = 50
+
+# Значения столбца артикулов, которые не являются позициями
+SKIP_ARTICLES = {'', 'nan', 'none', 'итого'}
+
+# Размер порции строк при потоковом чтении CSV
+CSV_CHUNK_ROWS = 50_000
+
+# Сколько похожих позиций предлагается для строки без аналога
+SUGGESTIONS = 3
+
+
+@dataclass(slots=True)
+class ImportReport:
+    """Результат импорта: найденные и ненайденные артикулы"""
+    hits: pd.DataFrame
+    misses: pd.DataFrame
+    rows: int = 0
+
+    @property
+    def loaded(self):
+        """Число найденных позиций"""
+        return len(self.hits)
+
+    @property
+    def total_qty(self):
+        """Общее количество найденных позиций"""
+        return int(self.hits['Кол-во'].sum()) if not self.hits.empty else 0
+
+    def summary(self):
+        """Сообщение о результате импорта"""
+        msg = f"Успешно загружено: {self.loaded} позиций\nОбщее количество: {self.total_qty}"
+        if not self.misses.empty:
+            msg += f"\n\nНе найдено артикулов: {len(self.misses)}"
+        return msg
+
+
+def read_table(source, file_type):
+    """
+    Читает загруженный файл один раз в таблицу без заголовков.
+
+    Excel читается через openpyxl в режиме read_only (так его открывает
+    pandas), CSV - C-движком pandas с разделителем ';'.
+    """
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    if file_type == "excel":
+        return pd.read_excel(source, engine='openpyxl', header=None, dtype=object)
+    return pd.read_csv(source, sep=';', header=None, dtype=str, encoding='utf-8-sig')
+
+
+def locate_columns(raw, key_pattern=ART_PATTERN):
+    """
+    Находит строку заголовка и столбцы ключа (артикула) и количества.
+
+    Заголовок - первая строка, к которой уже встретились оба ключевых
+    слова. Если заголовка нет, ключ берется из первого столбца, а
+    количество - из второго. Возвращает (строка заголовка или None,
+    столбец ключа, столбец количества или None).
+    """
+    head = raw.head(HEADER_SCAN_ROWS).astype(str)
+    text = head.apply(lambda col: col.str.strip().str.lower())
+    art_hits = text.apply(lambda col: col.str.contains(key_pattern, regex=True)).to_numpy()
+    qty_hits = text.apply(lambda col: col.str.contains(QTY_PATTERN, regex=True)).to_numpy()
+
+    found = np.maximum.accumulate(art_hits.any(axis=1)) & np.maximum.accumulate(qty_hits.any(axis=1))
+    if found.any():
+        header_row = int(found.argmax())
+        # Первая подходящая ячейка в порядке чтения: по строкам, затем по столбцам
+        art_col = int(np.argwhere(art_hits[:header_row + 1])[0][1])
+        qty_col = int(np.argwhere(qty_hits[:header_row + 1])[0][1])
+        return header_row, raw.columns[art_col], raw.columns[qty_col]
+
+    qty_col = raw.columns[1] if len(raw.columns) > 1 else None
+    return None, raw.columns[0], qty_col
+
+
+def normalize_articles(values):
+    """Артикулы одной операцией по столбцу: без пробелов и хвоста '.0' у чисел из Excel"""
+    arts = (
+        values.astype(str)
+        .str.replace(' ', '', regex=False)
+        .str.replace('\xa0', '', regex=False)
+        .str.strip()
+    )
+    # Регулярное выражение применяется только к редким значениям вида '7724651304.0'
+    floats = arts.str.endswith('.0')
+    if floats.any():
+        arts[floats] = arts[floats].str.replace(r'^(\d+)\.0$', r'\1', regex=True)
+    return arts
+
+
+def parse_quantities(values):
+    """Количества одной операцией по столбцу; нечисловые значения дают NaN"""
+    qty = pd.to_numeric(values, errors='coerce')
+    # Повторно разбираются только значения с пробелами или десятичной запятой
+    retry = qty.isna() & values.notna()
+    if retry.any():
+        text = values[retry].astype(str).str.replace(r'\s+', '', regex=True).str.replace(',', '.', regex=False)
+        qty = qty.astype(float)
+        qty[retry] = pd.to_numeric(text, errors='coerce')
+    return qty
+
+
+def extract_lines(raw, art_col, qty_col, start=0):
+    """
+    Строки с артикулом и положительным количеством, суммированные по артикулу.
+
+    Порядок артикулов - порядок первого появления в файле.
+    """
+    data = raw.iloc[start:]
+    arts = normalize_articles(data[art_col])
+    qty = parse_quantities(data[qty_col])
+
+    valid = ~arts.str.lower().isin(SKIP_ARTICLES) & (qty > 0)
+    lines = pd.DataFrame({
+        'Артикул': arts[valid],
+        'Кол-во': np.floor(qty[valid]).astype(np.int64),
+    })
+    lines = lines[lines['Кол-во'] > 0]
+    return lines.groupby('Артикул', sort=False, as_index=False)['Кол-во'].sum()
+
+
+def match_articles(lines, catalog):
+    """
+    Объединяет строки импорта с индексом артикулов каталога.
+
+    Артикулы с подчеркиваниями дополнительно ищутся без них, как в
+    Catalog.lookup. Возвращает (найденные строки с наименованием,
+    ненайденные строки).
+    """
+    known = catalog.table[['Артикул', 'Наименование']]
+    arts = lines['Артикул']
+    arts = arts.where(arts.isin(known['Артикул']), arts.str.replace('_', '', regex=False))
+    found = arts.isin(known['Артикул'])
+
+    hits = pd.DataFrame({'Артикул': arts[found], 'Кол-во': lines['Кол-во'][found]})
+    hits = hits.groupby('Артикул', sort=False, as_index=False)['Кол-во'].sum()
+    hits = hits.merge(known, on='Артикул', how='left', sort=False)
+    misses = lines[~found].reset_index(drop=True)
+    return hits[['Артикул', 'Наименование', 'Кол-во']], misses
+
+
+def apply_to_order(hits, catalog, order):
+    """Добавляет найденные позиции в заказ одной пачкой"""
+    order.add_many(
+        (catalog.articles[art], qty)
+        for art, qty in zip(hits['Артикул'], hits['Кол-во'].tolist())
+    )
+
+
+def _source_size(source):
+    """Размер загруженного файла в байтах (для индикатора прогресса)"""
+    size = getattr(source, 'size', None)
+    if size is None and hasattr(source, 'seek'):
+        size = source.seek(0, 2)
+        source.seek(0)
+    return size or 0
+
+
+def read_csv_lines(source, chunksize=CSV_CHUNK_ROWS, progress=None):
+    """
+    Потоковое чтение CSV порциями по chunksize строк.
+
+    Заголовок и столбцы определяются по первой порции, количества по
+    артикулам суммируются по мере чтения, поэтому в памяти держится одна
+    порция и таблица уникальных артикулов. progress(доля) вызывается после
+    каждой порции. Возвращает (строки импорта, число строк данных).
+    """
+    size = _source_size(source)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+    reader = pd.read_csv(
+        source, sep=';', header=None, dtype=str, encoding='utf-8-sig', chunksize=chunksize
+    )
+    totals = _empty_lines()
+    columns = None
+    rows = 0
+    with reader:
+        for chunk in reader:
+            start = 0
+            if columns is None:
+                header_row, art_col, qty_col = locate_columns(chunk)
+                if qty_col is None:
+                    raise ValueError("Не найден столбец с количеством")
+                columns = (art_col, qty_col)
+                start = header_row + 1 if header_row is not None else 0
+
+            rows += len(chunk) - start
+            lines = extract_lines(chunk, *columns, start)
+            totals = pd.concat([totals, lines], ignore_index=True)
+            totals = totals.groupby('Артикул', sort=False, as_index=False)['Кол-во'].sum()
+
+            if progress is not None and size:
+                progress(min(source.tell() / size, 1.0))
+
+    if progress is not None:
+        progress(1.0)
+    return totals, rows
+
+
+def import_meteor_spec(source, file_type, catalog, order, progress=None):
+    """
+    Импорт спецификации METEOR (Excel или CSV) в заказ.
+
+    Excel читается один раз целиком, CSV - потоково порциями (см.
+    read_csv_lines). Артикулы сопоставляются с каталогом объединением
+    таблиц. Возвращает ImportReport; если столбец количества не найден,
+    выбрасывает ValueError.
+    """
+    if file_type == "excel":
+        raw = read_table(source, file_type)
+        if raw.empty:
+            return ImportReport(hits=_empty_hits(), misses=_empty_lines())
+
+        header_row, art_col, qty_col = locate_columns(raw)
+        if qty_col is None:
+            raise ValueError("Не найден столбец с количеством")
+
+        start = header_row + 1 if header_row is not None else 0
+        lines = extract_lines(raw, art_col, qty_col, start)
+        rows = len(raw) - start
+    else:
+        lines, rows = read_csv_lines(source, progress=progress)
+
+    hits, misses = match_articles(lines, catalog)
+    apply_to_order(hits, catalog, order)
+    return ImportReport(hits=hits, misses=misses, rows=rows)
+
+
+def match_foreign_spec(source, file_type, matcher, catalog, order):
+    """
+    Подбор аналогов METEOR для спецификации другого производителя.
+
+    Наименования разбираются и сопоставляются с каталогом по всему
+    столбцу сразу (CompetitorMatcher.match_frame), найденные позиции
+    добавляются в заказ одной пачкой. Для строк без аналога одним
+    нечетким поиском подбираются похожие позиции (столбец "Варианты Meteor"),
+    в заказ они не добавляются. Возвращает таблицу соответствия в порядке
+    строк файла.
+    """
+    raw = read_table(source, file_type)
+    if raw.empty:
+        return _empty_correspondence()
+
+    header_row, name_col, qty_col = locate_columns(raw, NAME_PATTERN)
+    if qty_col is None:
+        raise ValueError("Не найден столбец с количеством")
+
+    data = raw.iloc[header_row + 1 if header_row is not None else 0:]
+    names = data[name_col].where(data[name_col].notna(), "").astype(str).str.strip()
+    qty = np.floor(parse_quantities(data[qty_col]).fillna(0))
+
+    # Пропускаем пустые строки и нерадиаторы
+    valid = (qty > 0) & (names != "") & names.str.contains(RADIATOR_PATTERN, case=False, regex=True)
+    names = names[valid]
+    qty = qty[valid].astype(np.int64)
+    if names.empty:
+        return _empty_correspondence()
+
+    found = matcher.match_frame(names)
+    hit = found['Артикул'].notna()
+
+    hits = pd.DataFrame({'Артикул': found['Артикул'][hit], 'Кол-во': qty[hit]})
+    hits = hits.groupby('Артикул', sort=False, as_index=False)['Кол-во'].sum()
+    apply_to_order(hits, catalog, order)
+
+    suggestions = np.full(len(names), "", dtype=object)
+    if not hit.all():
+        suggestions[~hit.to_numpy()] = [
+            "; ".join(f"{item.art} {item.name} ({score:.2f})" for item, score in found_items)
+            for found_items in matcher.suggest_many(names[~hit], SUGGESTIONS)
+        ]
+
+    return pd.DataFrame({
+        "Оригинальное наименование": names.to_numpy(),
+        "Количество": qty.to_numpy(),
+        "Аналог Meteor": found['Наименование'].fillna("").to_numpy(),
+        "Артикул Meteor": found['Артикул'].fillna("").to_numpy(),
+        "Комментарий": np.where(hit, "Автоматически определен", "Не найден аналог"),
+        "Варианты Meteor": suggestions,
+    })
+
+
+def _empty_correspondence():
+    return pd.DataFrame(columns=[
+        "Оригинальное наименование", "Количество", "Аналог Meteor", "Артикул Meteor", "Комментарий",
+        "Варианты Meteor",
+    ])
+
+
+def _empty_lines():
+    return pd.DataFrame({'Артикул': pd.Series(dtype=object), 'Кол-во': pd.Series(dtype='int64')})
+
+
+def _empty_hits():
+    return pd.DataFrame({
+        'Артикул': pd.Series(dtype=object),
+        'Наименование': pd.Series(dtype=object),
+        'Кол-во': pd.Series(dtype='int64'),
+    })
@@ -0,0 +1,205 @@
+# utils/mappings.py
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from utils.matcher import normalize_name
+
+MAPPINGS_DB_PATH = Path("data/mappings.sqlite3")
+MAPPINGS_JSON_PATH = Path("data/mappings.json")
+
+# Сколько соответствий держится в кэше чтения процесса
+MAPPINGS_CACHE_SIZE = 100_000
+
+# Размер пачки ключей в одном запросе IN (...)
+QUERY_BATCH = 500
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('connection', 'rad_type', 'meteor_art', 'meteor_name')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mappings (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    connection TEXT,
+    rad_type TEXT,
+    meteor_art TEXT NOT NULL,
+    meteor_name TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('version', 0);
+"""
+
+
+class MappingStore:
+    """
+    Хранилище соответствий "наименование конкурента -> радиатор METEOR" в SQLite.
+
+    Ключ - нормализованное наименование (первичный ключ, поиск по индексу).
+    База открывается в режиме WAL, поэтому сессии читают параллельно с записью.
+    Каждая запись увеличивает счетчик версии в таблице meta; кэш чтения
+    процесса сбрасывается, когда счетчик меняется (в том числе из другого
+    процесса). При первом открытии переносятся соответствия из mappings.json.
+    """
+
+    def __init__(self, path=MAPPINGS_DB_PATH, json_path=MAPPINGS_JSON_PATH,
+                 cache_size=MAPPINGS_CACHE_SIZE):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_version = None
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(SCHEMA)
+
+        if json_path is not None:
+            self._migrate_json(Path(json_path))
+
+    def version(self):
+        """Счетчик версии: увеличивается при каждой записи"""
+        with self._lock:
+            return self._read_version()
+
+    def get(self, name):
+        """Соответствие для наименования (словарь) или None"""
+        return self.get_many([name]).get(normalize_name(name))
+
+    def get_many(self, names):
+        """
+        Соответствия для набора наименований: словарь ключ -> соответствие.
+
+        Ключи, которых нет в кэше, запрашиваются пачками по индексу.
+        В результат попадают только найденные наименования.
+        """
+        keys = list(dict.fromkeys(normalize_name(name) for name in names))
+        with self._lock:
+            self._sync_cache()
+            found = {}
+            missing = []
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    if self._cache[key] is not None:
+                        found[key] = self._cache[key]
+                else:
+                    missing.append(key)
+
+            for start in range(0, len(missing), QUERY_BATCH):
+                batch = missing[start:start + QUERY_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, {', '.join(FIELDS)} FROM mappings "
+                    f"WHERE key IN ({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                loaded = {row[0]: dict(zip(FIELDS, row[1:])) for row in rows}
+                for key in batch:
+                    # Отсутствие соответствия тоже запоминается
+                    self._remember(key, loaded.get(key))
+                found.update(loaded)
+            return found
+
+    def upsert(self, name, mapping):
+        """Добавляет или обновляет одно соответствие"""
+        self.upsert_many({name: mapping})
+
+    def upsert_many(self, mappings):
+        """Добавляет или обновляет соответствия одной транзакцией"""
+        rows = [
+            (normalize_name(name), str(name), *(mapping.get(field) for field in FIELDS))
+            for name, mapping in dict(mappings).items()
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO mappings (key, name, connection, rad_type, meteor_art, meteor_name) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET name=excluded.name, connection=excluded.connection, "
+                    "rad_type=excluded.rad_type, meteor_art=excluded.meteor_art, "
+                    "meteor_name=excluded.meteor_name",
+                    rows,
+                )
+                self._conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'version'")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def items(self):
+        """Все соответствия: пары (исходное наименование, соответствие)"""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT name, {', '.join(FIELDS)} FROM mappings").fetchall()
+        return [(row[0], dict(zip(FIELDS, row[1:]))) for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM mappings").fetchone()[0]
+
+    def close(self):
+        """Закрывает соединение с базой"""
+        with self._lock:
+            self._conn.close()
+
+    def _read_version(self):
+        return self._conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()[0]
+
+    def _sync_cache(self):
+        """Сбрасывает кэш, если база изменилась с момента его заполнения"""
+        version = self._read_version()
+        if version != self._cache_version:
+            self._cache.clear()
+            self._cache_version = version
+
+    def _remember(self, key, mapping):
+        self._cache[key] = mapping
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def _migrate_json(self, json_path):
+        """
+        Однократный перенос соответствий из mappings.json.
+
+        Файл не в виде словаря пропускается целиком, как его пропускала
+        прежняя загрузка на странице импорта; записи без артикула METEOR
+        пропускаются с предупреждением в журнале.
+        """
+        with self._lock:
+            done = self._conn.execute("SELECT 1 FROM meta WHERE name = 'json_migrated'").fetchone()
+        if done or not json_path.exists():
+            return
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                mappings = json.load(f)
+        except (OSError, ValueError):
+            mappings = {}
+        if not isinstance(mappings, dict):
+            logger.warning("%s: ожидается словарь соответствий, файл пропущен", json_path)
+            mappings = {}
+
+        valid = {
+            name: mapping for name, mapping in mappings.items()
+            if isinstance(mapping, dict) and mapping.get('meteor_art')
+        }
+        if len(valid) < len(mappings):
+            logger.warning("%s: пропущено соответствий без артикула METEOR: %d",
+                           json_path, len(mappings) - len(valid))
+
+        self.upsert_many(valid)
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('json_migrated', 1)")
@@ -0,0 +1,290 @@
+# utils/matcher.py
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from utils.catalog import CatalogItem
+from utils.fuzzy import FuzzyIndex
+
+# Сколько разных наименований конкурентов запоминается
+MATCH_CACHE_SIZE = 65_536
+
+# Как часто (секунд) одиночные вызовы проверяют версию хранилища соответствий
+STORE_CHECK_SECONDS = 1.0
+
+# Высота по умолчанию для формата "ЛК 11-504"
+LK_HEIGHT = 500
+
+# Шаблоны наименований конкурентов, проверяются по порядку.
+# Формат "letter": буква подключения, тип, высота, длина;
+# формат "lk": тип и длина, высота по умолчанию.
+NAME_PATTERNS = [
+    # Панельный стальной радиатор Valve Compact тип VС 22-500-600
+    ("letter", re.compile(r'(?:радиатор|radiator).*?тип\s*([ckv])\s*(\d+)[-\s](\d+)[-\s](\d+)', re.IGNORECASE)),
+    # Радиаторы стальные штампованные "Лидея" ЛК 11-504
+    ("lk", re.compile(r'(?:радиатор|radiator).*?[лl][кk]\s*(\d+)[-\s](\d+)', re.IGNORECASE)),
+    # VC 22-500-600
+    ("letter", re.compile(r'([ckv])\s*(\d+)[-\s](\d+)[-\s](\d+)', re.IGNORECASE)),
+    # ЛК 11-504
+    ("lk", re.compile(r'[лl][кk]\s*(\d+)[-\s](\d+)', re.IGNORECASE)),
+]
+
+
+@dataclass(frozen=True, slots=True)
+class AnalogMatch:
+    """Аналог METEOR для наименования конкурента"""
+    name: str
+    item: CatalogItem
+    source: str
+
+
+def normalize_name(name):
+    """Ключ наименования: без лишних пробелов и без учета регистра"""
+    return " ".join(str(name).split()).lower()
+
+
+def parse_name(name):
+    """
+    Разбирает наименование конкурента на параметры радиатора.
+
+    Возвращает словарь с ключами 'connection', 'type', 'height', 'length'
+    или None, если ни один шаблон не подошел.
+    """
+    for kind, pattern in NAME_PATTERNS:
+        match = pattern.search(str(name))
+        if match is None:
+            continue
+
+        if kind == "letter":
+            letter, rad_type, height, length = match.groups()
+            connection = "VK-правое" if letter.upper() in ("V", "C") else "K-боковое"
+            return {'connection': connection, 'type': rad_type, 'height': int(height), 'length': int(length)}
+
+        rad_type, length = match.groups()
+        return {'connection': "VK-правое", 'type': rad_type, 'height': LK_HEIGHT, 'length': int(length)}
+
+    return None
+
+
+def normalize_names(names):
+    """Ключи наименований для целого столбца, как normalize_name"""
+    return (
+        pd.Series(names, dtype=object).astype(str)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+        .str.lower()
+    )
+
+
+def parse_names(names):
+    """
+    Векторный разбор столбца наименований теми же шаблонами, что parse_name.
+
+    Каждый шаблон применяется одним вызовом str.extract к строкам, которые
+    еще не разобраны. Возвращает таблицу с индексом names и столбцами
+    'connection', 'type', 'height', 'length' (пропуски - не разобрано).
+    """
+    names = pd.Series(names, dtype=object).astype(str)
+    connection = pd.Series(np.nan, index=names.index, dtype=object)
+    rad_type = pd.Series(np.nan, index=names.index, dtype=object)
+    height = pd.Series(np.nan, index=names.index, dtype=float)
+    length = pd.Series(np.nan, index=names.index, dtype=float)
+
+    pending = names
+    for kind, pattern in NAME_PATTERNS:
+        if pending.empty:
+            break
+        groups = pending.str.extract(pattern)
+        groups = groups[groups[0].notna()]
+        rows = groups.index
+
+        if kind == "letter":
+            connection[rows] = np.where(groups[0].str.upper().isin(["V", "C"]), "VK-правое", "K-боковое")
+            rad_type[rows] = groups[1]
+            height[rows] = pd.to_numeric(groups[2])
+            length[rows] = pd.to_numeric(groups[3])
+        else:
+            connection[rows] = "VK-правое"
+            rad_type[rows] = groups[0]
+            height[rows] = LK_HEIGHT
+            length[rows] = pd.to_numeric(groups[1])
+
+        pending = pending.drop(rows)
+
+    return pd.DataFrame({
+        'connection': connection,
+        'type': rad_type,
+        'height': height.astype('Int64'),
+        'length': length.astype('Int64'),
+    })
+
+
+def build_grid_table(catalog):
+    """Таблица (лист, высота, длина) -> позиция, как Catalog.find, для объединения"""
+    return pd.DataFrame(
+        [
+            (sheet_name, height, length, item.art, item.name)
+            for sheet_name, grid in catalog.grids.items()
+            for (height, length), item in grid.items()
+        ],
+        columns=['Лист', 'Высота', 'Длина', 'Артикул', 'Наименование'],
+    ).astype({'Высота': 'Int64', 'Длина': 'Int64'})
+
+
+class CompetitorMatcher:
+    """
+    Подбор аналогов METEOR по наименованиям конкурентов.
+
+    Строится один раз на процесс: шаблоны скомпилированы на уровне модуля,
+    а результаты запоминаются в LRU-кэше по нормализованному наименованию,
+    поэтому повторяющиеся строки спецификации разрешаются за O(1).
+    Сохраненные соответствия берутся из store (см. utils/mappings.py);
+    кэш сбрасывается, когда меняется версия хранилища. Версия проверяется
+    один раз на пачку (match_many, match_frame), а одиночные вызовы
+    проверяют ее не чаще раза в STORE_CHECK_SECONDS.
+    """
+
+    def __init__(self, catalog, store=None, cache_size=MATCH_CACHE_SIZE):
+        self.catalog = catalog
+        self.store = store
+        self.grid_table = build_grid_table(catalog)
+        self._match = lru_cache(maxsize=cache_size)(self._resolve)
+        self._store_version = None
+        self._store_checked = None
+        self._fuzzy = None
+        self._fuzzy_version = None
+
+    def match(self, name):
+        """Аналог для одного наименования или None"""
+        self._sync(force=False)
+        return self._match(normalize_name(name))
+
+    def match_many(self, names):
+        """Аналоги для столбца наименований: каждое уникальное наименование разбирается один раз"""
+        self._sync()
+        keys = [normalize_name(name) for name in names]
+        found = {key: self._match(key) for key in dict.fromkeys(keys)}
+        return [found[key] for key in keys]
+
+    def match_frame(self, names):
+        """
+        Аналоги для столбца наименований одним объединением с сеткой каталога.
+
+        Уникальные наименования разбираются векторно (parse_names) и
+        объединяются с таблицей типоразмеров; сохраненные соответствия имеют
+        приоритет. Возвращает таблицу с индексом names и столбцами
+        'Артикул', 'Наименование', 'Источник' (пропуски - аналог не найден).
+        """
+        self._sync()
+        names = pd.Series(names, dtype=object)
+        keys = normalize_names(names)
+        unique = pd.Series(keys.unique())
+
+        parsed = parse_names(unique)
+        parsed['key'] = unique
+        parsed['Лист'] = parsed['connection'] + " " + parsed['type']
+        found = parsed.merge(
+            self.grid_table,
+            left_on=['Лист', 'height', 'length'],
+            right_on=['Лист', 'Высота', 'Длина'],
+            how='left',
+            sort=False,
+        ).set_index('key')
+        found['Источник'] = np.where(found['Артикул'].notna(), "pattern", None)
+        found = found[['Артикул', 'Наименование', 'Источник']]
+
+        # Сохраненные соответствия перекрывают разбор по шаблонам
+        mappings = self.store.get_many(unique) if self.store is not None else {}
+        for key, mapping in mappings.items():
+            match = self._from_mapping(mapping)
+            if match is not None:
+                found.loc[key] = [match.item.art, match.name, match.source]
+
+        result = found.reindex(keys.to_numpy())
+        result.index = names.index
+        return result
+
+    def suggest_many(self, names, k=3):
+        """
+        Похожие позиции METEOR для наименований, которые не удалось разобрать.
+
+        Нечеткий поиск по n-граммам наименований каталога и сохраненных
+        соответствий, одной пачкой на весь столбец. Возвращает для каждого
+        наименования список пар (позиция каталога, близость).
+        """
+        self._sync(force=False)
+        index = self._fuzzy_index()
+        return [
+            [(self.catalog.articles[art], score) for art, score in found]
+            for found in index.search_many([normalize_name(name) for name in names], k)
+        ]
+
+    def _fuzzy_index(self):
+        """Индекс нечеткого поиска; пересобирается, когда меняется версия хранилища"""
+        version = self._store_version
+        if self._fuzzy is None or version != self._fuzzy_version:
+            index = FuzzyIndex()
+            index.add(self.catalog.table['Наименование'], self.catalog.table['Артикул'])
+            if self.store is not None:
+                self._add_fuzzy_mappings(index, self.store.items())
+            self._fuzzy, self._fuzzy_version = index, version
+        return self._fuzzy
+
+    def _add_fuzzy_mappings(self, index, mappings):
+        """Добавляет в индекс сохраненные соответствия, позиции которых есть в каталоге"""
+        names, arts = [], []
+        for name, mapping in mappings:
+            art = str(mapping['meteor_art']).strip()
+            if art in self.catalog.articles:
+                names.append(normalize_name(name))
+                arts.append(art)
+        index.add(names, arts)
+
+    def _sync(self, force=True):
+        """
+        Сбрасывает кэш результатов, если соответствия изменились.
+
+        Без force версия хранилища не запрашивается, если ее проверяли
+        меньше STORE_CHECK_SECONDS назад.
+        """
+        if self.store is None:
+            return
+        now = time.monotonic()
+        if not force and self._store_checked is not None and now - self._store_checked < STORE_CHECK_SECONDS:
+            return
+        self._store_checked = now
+        version = self.store.version()
+        if version != self._store_version:
+            self._match.cache_clear()
+            self._store_version = version
+
+    def _from_mapping(self, mapping):
+        """Аналог по сохраненному соответствию или None, если позиции нет в каталоге"""
+        sheet_name = f"{mapping['connection']} {mapping['rad_type']}"
+        product = self.catalog.lookup(mapping['meteor_art'], sheet_name)
+        if product is None:
+            return None
+        return AnalogMatch(name=mapping['meteor_name'], item=product, source="mapping")
+
+    def _resolve(self, key):
+        # Сначала сохраненные соответствия
+        mapping = self.store.get(key) if self.store is not None else None
+        if mapping is not None:
+            match = self._from_mapping(mapping)
+            if match is not None:
+                return match
+
+        # Затем разбор наименования по шаблонам
+        parameters = parse_name(key)
+        if parameters is None:
+            return None
+
+        sheet_name = f"{parameters['connection']} {parameters['type']}"
+        product = self.catalog.find(sheet_name, parameters['height'], parameters['length'])
+        if product is None:
+            return None
+        return AnalogMatch(name=product.name, item=product, source="pattern")
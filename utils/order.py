@@ -0,0 +1,195 @@
+# utils/order.py
+import hashlib
+from dataclasses import dataclass
+
+from utils.catalog import CatalogItem
+from utils.quantity import parse_quantity, parse_quantity_many
+
+# Сколько последних изменений гарантированно хранит журнал заказа
+JOURNAL_SIZE = 10_000
+
+
+@dataclass(slots=True)
+class OrderLine:
+    """Строка заказа: позиция каталога, введенная формула и разобранное количество"""
+    item: CatalogItem
+    raw: str
+    qty: int
+
+
+class Order:
+    """
+    Заказ радиаторов, ключ строки - артикул каталога.
+
+    Формула из ячейки разбирается один раз при изменении, а итоги по
+    количеству, мощности, весу, объему и стоимости обновляются
+    инкрементально, поэтому страницы читают их за O(1). Журнал изменений
+    (changes_since) позволяет производным данным обновлять только
+    измененные строки.
+    """
+
+    def __init__(self):
+        self._lines = {}
+        self.version = 0
+        self.filled = 0
+        self.total_qty = 0
+        self.total_power = 0.0
+        self.total_weight = 0.0
+        self.total_volume = 0.0
+        self.total_price = 0.0
+        self._fingerprint = None
+        self._journal = []
+        self._journal_start = 0
+
+    def __bool__(self):
+        return self.filled > 0
+
+    def __contains__(self, art):
+        return art in self._lines
+
+    def line(self, art):
+        """Строка заказа по артикулу или None"""
+        return self._lines.get(art)
+
+    def raw(self, art):
+        """Введенная формула по артикулу (пустая строка, если позиции нет)"""
+        line = self._lines.get(art)
+        return line.raw if line is not None else ""
+
+    def qty(self, art):
+        """Количество по артикулу"""
+        line = self._lines.get(art)
+        return line.qty if line is not None else 0
+
+    def set(self, item, raw):
+        """
+        Устанавливает формулу для позиции каталога.
+
+        Пустая формула удаляет строку. Возвращает True, если заказ изменился.
+        """
+        changed = self._replace(item, raw)
+        if changed:
+            self.version += 1
+        return changed
+
+    def set_many(self, items, raws):
+        """
+        Устанавливает формулы пачкой (например, всю матрицу листа).
+
+        Формулы разбираются одним векторным вызовом, версия заказа
+        увеличивается один раз. Возвращает число измененных строк.
+        """
+        raws = [str(raw).strip() for raw in raws]
+        changed = 0
+        for item, raw, qty in zip(items, raws, parse_quantity_many(raws).tolist()):
+            changed += self._replace(item, raw, qty)
+        if changed:
+            self.version += 1
+        return changed
+
+    def add(self, item, qty):
+        """Добавляет количество к позиции (например, при импорте)"""
+        return self.set(item, str(self.qty(item.art) + int(qty)))
+
+    def add_many(self, pairs):
+        """
+        Добавляет количества пачкой: pairs - пары (позиция каталога, количество).
+
+        Версия заказа увеличивается один раз на всю пачку.
+        Возвращает число измененных строк.
+        """
+        changed = 0
+        for item, qty in pairs:
+            total = self.qty(item.art) + int(qty)
+            changed += self._replace(item, str(total), total)
+        if changed:
+            self.version += 1
+        return changed
+
+    def remove(self, art):
+        """Удаляет позицию из заказа"""
+        line = self._lines.get(art)
+        if line is None:
+            return False
+        return self.set(line.item, "")
+
+    def clear(self):
+        """Очищает заказ; версия и позиция журнала продолжают расти"""
+        version, position = self.version, self.journal_position()
+        self.__init__()
+        self.version = version + 1
+        self._journal_start = position + 1
+
+    def journal_position(self):
+        """Позиция конца журнала изменений"""
+        return self._journal_start + len(self._journal)
+
+    def changes_since(self, position):
+        """
+        Артикулы строк, измененных после позиции журнала position.
+
+        Возвращает None, если журнал уже не покрывает эту позицию (после
+        очистки заказа или слишком большого числа изменений) - тогда
+        производные данные нужно пересчитать целиком.
+        """
+        if position is None or not self._journal_start <= position <= self.journal_position():
+            return None
+        return self._journal[position - self._journal_start:]
+
+    def lines(self):
+        """Строки с ненулевым количеством в порядке ввода"""
+        return [line for line in self._lines.values() if line.qty > 0]
+
+    def entries(self):
+        """Все введенные формулы по артикулам, включая нулевые"""
+        return {art: line.raw for art, line in self._lines.items()}
+
+    def fingerprint(self):
+        """
+        Хеш содержимого заказа: артикулы и количества в порядке ввода.
+
+        Одинаковые заказы дают одинаковый хеш независимо от сессии, поэтому
+        он служит ключом общего кэша экспорта. Пересчитывается только после
+        изменения заказа.
+        """
+        if self._fingerprint is None or self._fingerprint[0] != self.version:
+            digest = hashlib.sha256()
+            for line in self.lines():
+                digest.update(f"{line.item.art}\t{line.qty}\n".encode())
+            self._fingerprint = (self.version, digest.hexdigest())
+        return self._fingerprint[1]
+
+    def _replace(self, item, raw, qty=None):
+        """Заменяет строку позиции без изменения версии; qty - уже разобранное количество"""
+        raw = str(raw).strip()
+        line = self._lines.get(item.art)
+        if (line.raw if line is not None else "") == raw:
+            return False
+
+        if line is not None:
+            self._account(line, -1)
+            del self._lines[item.art]
+
+        if raw:
+            line = OrderLine(item=item, raw=raw, qty=parse_quantity(raw) if qty is None else qty)
+            self._lines[item.art] = line
+            self._account(line, 1)
+
+        self._journal.append(item.art)
+        if len(self._journal) > 2 * JOURNAL_SIZE:
+            # Старая половина журнала отбрасывается целиком, а не по одной записи
+            del self._journal[:JOURNAL_SIZE]
+            self._journal_start += JOURNAL_SIZE
+        return True
+
+    def _account(self, line, sign):
+        """Учитывает строку в итогах заказа со знаком sign"""
+        if line.qty <= 0:
+            return
+        item = line.item
+        self.filled += sign
+        self.total_qty += sign * line.qty
+        self.total_power += sign * item.power * line.qty
+        self.total_weight += sign * item.weight * line.qty
+        self.total_volume += sign * item.volume * line.qty
+        self.total_price += sign * item.price * line.qty
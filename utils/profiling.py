@@ -0,0 +1,253 @@
+# utils/profiling.py
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+# Замеры для всех сессий (например, на сервере): RADIATOOL_PROFILE=1
+PROFILE_ENV = "RADIATOOL_PROFILE"
+
+# Журнал перезапусков в формате JSONL: RADIATOOL_PROFILE_LOG=logs/reruns.jsonl
+PROFILE_LOG_ENV = "RADIATOOL_PROFILE_LOG"
+
+# Перезапуск дольше порога (секунд) отмечается в замерах как медленный
+PROFILE_SLOW_ENV = "RADIATOOL_PROFILE_SLOW"
+SLOW_RERUN_SECONDS = 1.0
+
+# Доля перезапусков со снимком cProfile (0..1), по умолчанию только по запросу
+PROFILE_SAMPLE_ENV = "RADIATOOL_PROFILE_SAMPLE"
+
+# Размер файла журнала и число старых файлов при ротации
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+
+# Сколько функций снимка cProfile сохраняется (по накопленному времени)
+PROFILE_TOP = 30
+
+# Сколько последних перезапусков хранится в сессии для панели
+RERUN_HISTORY = 20
+
+# Этап, который ничего не замеряет (замеры выключены)
+_NO_STAGE = nullcontext()
+
+
+@dataclass(slots=True)
+class RerunTimings:
+    """Замеры одного перезапуска страницы: время и число вызовов по этапам"""
+    page: str
+    started: datetime
+    stages: dict = field(default_factory=dict)
+    total: float = 0.0
+    interrupted: bool = False
+    slow: bool = False
+    profile: list | None = None
+
+    def add(self, stage, seconds):
+        """Учитывает один вызов этапа"""
+        timing = self.stages.setdefault(stage, [0.0, 0])
+        timing[0] += seconds
+        timing[1] += 1
+
+    def rows(self):
+        """Строки таблицы этапов для панели"""
+        return [
+            {"Этап": stage, "Время, мс": round(seconds * 1000, 2), "Вызовов": calls}
+            for stage, (seconds, calls) in self.stages.items()
+        ]
+
+    def record(self):
+        """Запись журнала (словарь для JSON)"""
+        return {
+            "time": self.started.isoformat(timespec="milliseconds"),
+            "page": self.page,
+            "total_ms": round(self.total * 1000, 2),
+            "interrupted": self.interrupted,
+            "slow": self.slow,
+            "stages": {
+                stage: {"ms": round(seconds * 1000, 2), "calls": calls}
+                for stage, (seconds, calls) in self.stages.items()
+            },
+            **({"profile": self.profile} if self.profile is not None else {}),
+        }
+
+
+class RerunProfiler:
+    """
+    Замеры этапов перезапусков страниц одной сессии.
+
+    Страница вызывает begin() в начале и end() в конце, а этапы оборачивает
+    в stage(): время этапа и число вызовов суммируются за перезапуск.
+    Перезапуск, прерванный st.rerun() или st.stop(), закрывается следующим
+    begin() со временем до последнего завершенного этапа. Если замеры
+    выключены, stage() возвращает пустой контекст и ничего не стоит.
+
+    Перезапуски дольше slow_seconds отмечаются как медленные по замерам
+    этапов. Снимок cProfile (самые долгие функции по накопленному времени)
+    снимается только по запросу: для следующего перезапуска после
+    request_profile() и для доли sample_rate случайных перезапусков.
+    Если задан журнал, каждый перезапуск записывается в него строкой JSON.
+    """
+
+    def __init__(self, log=None, slow_seconds=SLOW_RERUN_SECONDS, sample_rate=0.0, history=RERUN_HISTORY):
+        self.log = log
+        self.slow_seconds = slow_seconds
+        self.sample_rate = sample_rate
+        self.profile_next = False
+        self.history = deque(maxlen=history)
+        self.current = None
+        self._started = 0.0
+        self._mark = 0.0
+        self._profile = None
+
+    @property
+    def active(self):
+        """Идет замер перезапуска"""
+        return self.current is not None
+
+    def begin(self, page, enabled=True):
+        """Начало перезапуска страницы page"""
+        if self.current is not None:
+            self._finish(interrupted=True)
+        if not enabled:
+            return
+
+        self.current = RerunTimings(page=page, started=datetime.now())
+        if self.profile_next or (self.sample_rate > 0 and random.random() < self.sample_rate):
+            self.profile_next = False
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Уже работает другой профилировщик
+                self._profile = None
+        self._started = self._mark = time.perf_counter()
+
+    def request_profile(self):
+        """Снять снимок cProfile следующего перезапуска"""
+        self.profile_next = True
+
+    def stage(self, name):
+        """Контекст замера этапа name"""
+        if self.current is None:
+            return _NO_STAGE
+        return self._timed(name)
+
+    def end(self):
+        """Конец перезапуска: замеры попадают в историю и журнал"""
+        if self.current is not None:
+            self._mark = time.perf_counter()
+            self._finish(interrupted=False)
+
+    def last(self):
+        """Последний завершенный перезапуск или None"""
+        return self.history[-1] if self.history else None
+
+    def history_rows(self):
+        """Строки таблицы последних перезапусков (новые сверху)"""
+        return [
+            {
+                "Время": timings.started.strftime("%H:%M:%S"),
+                "Страница": timings.page,
+                "Всего, мс": round(timings.total * 1000, 2),
+                "Прерван": timings.interrupted,
+                "Медленный": timings.slow,
+                **{stage: round(seconds * 1000, 2) for stage, (seconds, _) in timings.stages.items()},
+            }
+            for timings in reversed(self.history)
+        ]
+
+    @contextmanager
+    def _timed(self, name):
+        current = self.current
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._mark = time.perf_counter()
+            current.add(name, self._mark - started)
+
+    def _finish(self, interrupted):
+        timings, self.current = self.current, None
+        timings.total = self._mark - self._started
+        timings.interrupted = interrupted
+        timings.slow = self.slow_seconds is not None and timings.total >= self.slow_seconds
+
+        profile, self._profile = self._profile, None
+        if profile is not None:
+            profile.disable()
+            timings.profile = profile_top(profile)
+
+        self.history.append(timings)
+        if self.log is not None:
+            self.log.info(json.dumps(timings.record(), ensure_ascii=False))
+
+
+def profile_top(profile, limit=PROFILE_TOP):
+    """Самые долгие функции снимка cProfile по накопленному времени"""
+    stats = pstats.Stats(profile)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    top = []
+    for func in stats.fcn_list[:limit]:
+        _, calls, own, cumulative, _ = stats.stats[func]
+        top.append({
+            "function": pstats.func_std_string(func),
+            "calls": calls,
+            "own_ms": round(own * 1000, 2),
+            "cum_ms": round(cumulative * 1000, 2),
+        })
+    return top
+
+
+@lru_cache(maxsize=None)
+def rerun_log(path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+    """
+    Журнал перезапусков: строки JSON в файле path с ротацией по размеру.
+
+    Один журнал на файл разделяется всеми сессиями процесса (запись
+    потокобезопасна).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    logger = logging.getLogger(f"radiatool.reruns.{path}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+
+def profiling_enabled():
+    """Замеры включены для всех сессий переменными окружения (журнал включает их тоже)"""
+    if os.environ.get(PROFILE_LOG_ENV, "").strip():
+        return True
+    return os.environ.get(PROFILE_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def create_profiler():
+    """Профилировщик сессии с журналом, порогом и долей снимков из переменных окружения"""
+    log_path = os.environ.get(PROFILE_LOG_ENV, "").strip()
+    try:
+        slow_seconds = float(os.environ.get(PROFILE_SLOW_ENV, SLOW_RERUN_SECONDS))
+    except ValueError:
+        slow_seconds = SLOW_RERUN_SECONDS
+    try:
+        sample_rate = min(max(float(os.environ.get(PROFILE_SAMPLE_ENV, 0.0)), 0.0), 1.0)
+    except ValueError:
+        sample_rate = 0.0
+    return RerunProfiler(
+        log=rerun_log(log_path) if log_path else None,
+        slow_seconds=slow_seconds,
+        sample_rate=sample_rate,
+    )
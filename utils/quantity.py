@@ -0,0 +1,113 @@
+# utils/quantity.py
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Сколько разных введенных формул запоминается
+QUANTITY_CACHE_SIZE = 65_536
+
+# Наибольшее количество (int64): слагаемые и суммы больше него - неверный ввод
+QUANTITY_MAX = int(np.iinfo(np.int64).max)
+
+# Строки с суммой или слагаемым больше порога векторный разбор пересчитывает
+# точно (parse_quantity): выше 2**53 float теряет целые числа
+_EXACT_LIMIT = 2.0 ** 53
+
+
+def parse_quantity(value):
+    """
+    Преобразует введенное значение в количество радиаторов.
+
+    Числа округляются до целого, строки разбираются как сумма слагаемых
+    через '+' ("2+3" -> 5, лишние '+' по краям игнорируются). Неверные
+    значения, в том числе заголовки "Кол-во" и "№" и числа за пределами
+    int64 (слагаемые или сумма), дают 0. Разбор строк
+    запоминается, поэтому повторный вызов на той же формуле - O(1).
+    """
+    if isinstance(value, str):
+        return _parse_text(value)
+    if not value:
+        return 0
+    if isinstance(value, (int, float, np.number)):
+        return _round_part(value) or 0
+    return _parse_text(str(value))
+
+
+def parse_quantity_many(values):
+    """
+    Количества для целого столбца формул (как parse_quantity).
+
+    Каждая уникальная формула разбирается один раз: слагаемые разделяются
+    одной операцией str.split и переводятся в числа pd.to_numeric.
+    Возвращает массив int64 той же длины, что values.
+    """
+    values = pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    parsed = np.zeros(len(uniques), dtype=np.int64)
+
+    is_text = np.fromiter((isinstance(value, str) for value in uniques), dtype=bool, count=len(uniques))
+    for i in np.flatnonzero(~is_text):
+        parsed[i] = parse_quantity(uniques[i])
+    if is_text.any():
+        parsed[is_text] = _parse_texts(pd.Series(uniques[is_text], dtype=object))
+
+    result = np.zeros(len(values), dtype=np.int64)
+    known = codes >= 0
+    result[known] = parsed[codes[known]]
+    return result
+
+
+@lru_cache(maxsize=QUANTITY_CACHE_SIZE)
+def _parse_text(value):
+    value = value.strip().strip('+')
+    total = 0
+    for part in value.split('+'):
+        if not part.strip():
+            continue
+        number = _round_part(part)
+        if number is None:
+            return 0
+        total += number
+    return total if abs(total) <= QUANTITY_MAX else 0
+
+
+def _round_part(part):
+    """Слагаемое, округленное до целого, или None, если это не число или оно вне int64"""
+    try:
+        # Целые строки разбираются точно, остальное - через float
+        number = int(part) if isinstance(part, str) and part.strip().isdigit() else int(round(float(part)))
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return number if abs(number) <= QUANTITY_MAX else None
+
+
+def _parse_texts(texts):
+    """Векторный разбор уникальных строк-формул"""
+    parts = texts.str.strip().str.strip('+').str.split('+', expand=True)
+    parts = parts.stack().str.strip()
+    parts = parts[parts != ""]
+
+    numbers = pd.to_numeric(parts, errors='coerce').astype(float)
+    valid = np.isfinite(numbers)
+    if not valid.all():
+        # Редкие значения, которые float() разбирает иначе, чем pd.to_numeric
+        retry = parts[~valid]
+        fallback = {part: _round_part(part) for part in retry.unique()}
+        numbers[~valid] = retry.map(fallback).astype(float)
+        valid = numbers.notna()
+
+    rows = parts.index.get_level_values(0)
+    large = valid & (numbers.abs() >= _EXACT_LIMIT)
+    rounded = np.round(numbers.where(valid & ~large, 0)).astype(np.int64)
+    totals = rounded.groupby(rows).sum()
+    broken = (~valid).groupby(rows).any()
+    totals[broken] = 0
+
+    # Большие слагаемые и суммы: переполнение int64 проверяется точно
+    float_totals = numbers.where(valid, 0).abs().groupby(rows).sum()
+    exact = (large.groupby(rows).any() | (float_totals >= _EXACT_LIMIT)) & ~broken
+    for row in exact[exact].index:
+        totals[row] = _parse_text(texts.iloc[row])
+
+    return totals.reindex(range(len(texts)), fill_value=0).to_numpy()
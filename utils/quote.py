@@ -0,0 +1,120 @@
+# utils/quote.py
+from dataclasses import dataclass
+
+import pandas as pd
+
+from utils.brackets import WALL, bracket_needs
+from utils.exporter import EXPORT_CACHE, create_excel_file, spec_export_key
+from utils.order import Order
+from utils.quantity import parse_quantity
+from utils.specification import (
+    SpecTotals, add_total_row, assemble_spec, order_frame, price_brackets, price_radiators, spec_totals
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Quote:
+    """Расчет стоимости заказа: спецификация без итоговой строки, итоги и условия"""
+    spec: pd.DataFrame
+    totals: SpecTotals | None
+    fingerprint: str
+    radiator_discount: float = 0.0
+    bracket_discount: float = 0.0
+    bracket_type: str = WALL
+
+    @property
+    def empty(self):
+        """Нет ни одной позиции"""
+        return self.spec.empty
+
+    @property
+    def export_key(self):
+        """Ключ общего кэша экспорта"""
+        return spec_export_key(
+            self.fingerprint, self.radiator_discount, self.bracket_discount, self.bracket_type
+        )
+
+    def with_total(self):
+        """Спецификация с итоговой строкой, как ее показывает страница"""
+        return add_total_row(self.spec, self.totals)
+
+    def to_xlsx(self, cache=EXPORT_CACHE):
+        """Байты XLSX спецификации; готовые файлы берутся из кэша по содержимому заказа"""
+        if self.empty:
+            return None
+
+        def build():
+            totals = self.totals
+            return create_excel_file(
+                self.with_total(), totals.power, totals.weight, totals.volume, totals.sum
+            )
+
+        if cache is None:
+            return build()
+        return cache.get_or_build(self.export_key, build)
+
+
+def prepare_spec_data(order, catalog, radiator_discount=0, bracket_discount=0, bracket_type=WALL,
+                      state=None):
+    """
+    Спецификация заказа и ее итоги: (спецификация, SpecTotals) или
+    (пустая таблица, None), если в заказе нет позиций.
+
+    Заказ объединяется с каталогом и таблицей кронштейнов, цены и суммы
+    считаются по столбцам целиком. Если передан state (OrderState сессии),
+    неизмененные узлы спецификации берутся из него.
+    """
+    if state is not None:
+        return state.spec(order, catalog.brackets, radiator_discount, bracket_discount, bracket_type)
+
+    lines = order_frame(order, catalog)
+    if lines.empty:
+        return pd.DataFrame(), None
+
+    radiators = price_radiators(lines, radiator_discount)
+    brackets = price_brackets(bracket_needs(lines, bracket_type), catalog.brackets, bracket_discount)
+    spec_data = assemble_spec(radiators, brackets)
+    return spec_data, spec_totals(lines, spec_data)
+
+
+def build_quote(order, catalog, radiator_discount=0, bracket_discount=0, bracket_type=WALL,
+                state=None):
+    """Расчет стоимости заказа (см. prepare_spec_data)"""
+    spec_data, totals = prepare_spec_data(
+        order, catalog, radiator_discount, bracket_discount, bracket_type, state
+    )
+    return Quote(
+        spec=spec_data,
+        totals=totals,
+        fingerprint=order.fingerprint(),
+        radiator_discount=float(radiator_discount or 0),
+        bracket_discount=float(bracket_discount or 0),
+        bracket_type=bracket_type,
+    )
+
+
+def order_from_lines(catalog, lines, max_qty=None):
+    """
+    Заказ из пар (артикул, количество).
+
+    Количество - число или формула ("2+3"), количества одинаковых
+    артикулов суммируются. Если сумма по позиции больше max_qty,
+    выбрасывается ValueError. Возвращает (заказ, список артикулов,
+    которых нет в каталоге).
+    """
+    order = Order()
+    pairs = []
+    totals = {}
+    missing = []
+    for art, qty in lines:
+        item = catalog.lookup(art)
+        if item is None:
+            missing.append(str(art))
+            continue
+        qty = parse_quantity(qty)
+        totals[item.art] = totals.get(item.art, 0) + qty
+        if max_qty is not None and totals[item.art] > max_qty:
+            raise ValueError(f"Количество артикула {item.art} больше {max_qty}")
+        pairs.append((item, qty))
+    order.add_many(pairs)
+    return order, missing
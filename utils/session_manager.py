@@ -1,8 +1,12 @@
 import streamlit as st
 
+from utils.derived import OrderState
+from utils.order import Order
+from utils.profiling import create_profiler, profiling_enabled
+
 def init_session_state():
-    if "entry_values" not in st.session_state:
-        st.session_state.entry_values = {}
+    if "order" not in st.session_state:
+        st.session_state.order = Order()
     if "connection" not in st.session_state:
         st.session_state.connection = "VK-правое"
     if "radiator_type" not in st.session_state:
@@ -12,4 +16,25 @@ def init_session_state():
     if "radiator_discount" not in st.session_state:
         st.session_state.radiator_discount = 0.0
     if "bracket_discount" not in st.session_state:
-        st.session_state.bracket_discount = 0.0
\ No newline at end of file
+        st.session_state.bracket_discount = 0.0
+
+def get_order_state(catalog):
+    """Производные данные заказа текущей сессии (см. utils/derived.py)"""
+    if "order_state" not in st.session_state:
+        st.session_state.order_state = OrderState(catalog)
+    return st.session_state.order_state
+
+def start_profiling(page):
+    """
+    Начинает замер перезапуска страницы page (см. utils/profiling.py).
+
+    Замеры включаются флажком в отладочной панели Главной или для всех
+    сессий переменными окружения.
+    """
+    if "profiler" not in st.session_state:
+        st.session_state.profiler = create_profiler()
+    if "profiling" not in st.session_state:
+        st.session_state.profiling = profiling_enabled()
+    profiler = st.session_state.profiler
+    profiler.begin(page, st.session_state.profiling)
+    return profiler
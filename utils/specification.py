@@ -0,0 +1,184 @@
+# utils/specification.py
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+SPEC_COLUMNS = [
+    "№", "Артикул", "Наименование", "Мощность, Вт",
+    "Цена, руб (с НДС)", "Скидка, %",
+    "Цена со скидкой, руб (с НДС)", "Кол-во",
+    "Сумма, руб (с НДС)"
+]
+
+
+@dataclass(frozen=True, slots=True)
+class SpecTotals:
+    """Итоговые показатели спецификации"""
+    power: float
+    weight: float
+    volume: float
+    radiators: int
+    brackets: int
+    sum: float
+
+
+def order_frame(order, catalog):
+    """
+    Строки заказа одной таблицей, объединенной с каталогом.
+
+    Порядок строк совпадает с порядком ввода позиций.
+    """
+    lines = order.lines()
+    frame = pd.DataFrame({
+        'Артикул': [line.item.art for line in lines],
+        'Кол-во': np.fromiter((line.qty for line in lines), dtype=np.int64, count=len(lines)),
+    })
+    return frame.merge(catalog.table, on='Артикул', how='inner', sort=False)
+
+
+def discounted(prices, discount):
+    """Цена со скидкой, округленная до копеек"""
+    discount = float(discount) if discount else 0.0
+    return (prices * (1 - discount / 100)).round(2)
+
+
+def price_radiators(lines, discount):
+    """
+    Строки радиаторов спецификации с ценами и суммами.
+
+    Сортировка: сначала VK, потом K, затем по типу, высоте и длине.
+    """
+    discount = float(discount) if discount else 0.0
+    price_discounted = discounted(lines['Цена, руб'], discount)
+
+    radiators = pd.DataFrame({
+        "Артикул": lines['Артикул'],
+        "Наименование": lines['Наименование'],
+        "Мощность, Вт": lines['Мощность, Вт'].astype(float),
+        "Цена, руб (с НДС)": lines['Цена, руб'].astype(float),
+        "Скидка, %": discount,
+        "Цена со скидкой, руб (с НДС)": price_discounted,
+        "Кол-во": lines['Кол-во'].astype(int),
+        "Сумма, руб (с НДС)": (price_discounted * lines['Кол-во']).round(2),
+        "ConnectionOrder": np.where(lines['Лист'].str.contains('VK'), 0, 1),
+        "RadiatorType": pd.to_numeric(lines['Тип'], errors='coerce').fillna(0).astype(int),
+        "Height": lines['Высота'],
+        "Length": lines['Длина'],
+    })
+
+    radiators = radiators.sort_values(
+        ["ConnectionOrder", "RadiatorType", "Height", "Length"], kind='mergesort'
+    )
+    return radiators.drop(columns=["ConnectionOrder", "RadiatorType", "Height", "Length"])
+
+
+def price_brackets(needs, brackets_df, discount):
+    """
+    Строки кронштейнов спецификации.
+
+    needs - потребность в кронштейнах (столбцы 'Артикул' и 'Кол-во'), строки
+    с одинаковым артикулом суммируются в порядке первого появления.
+    Артикулы, которых нет в таблице кронштейнов, пропускаются.
+    """
+    if needs.empty:
+        return pd.DataFrame(columns=SPEC_COLUMNS[1:])
+
+    discount = float(discount) if discount else 0.0
+    totals = needs.groupby('Артикул', sort=False, as_index=False)['Кол-во'].sum()
+    info = brackets_df[['Артикул', 'Наименование', 'Цена, руб']].drop_duplicates('Артикул')
+    totals = totals.merge(info, on='Артикул', how='inner', sort=False)
+
+    price_discounted = discounted(totals['Цена, руб'], discount)
+    return pd.DataFrame({
+        "Артикул": totals['Артикул'].astype(str),
+        "Наименование": totals['Наименование'].astype(str),
+        "Мощность, Вт": 0.0,
+        "Цена, руб (с НДС)": totals['Цена, руб'].astype(float),
+        "Скидка, %": discount,
+        "Цена со скидкой, руб (с НДС)": price_discounted,
+        "Кол-во": totals['Кол-во'].astype(int),
+        "Сумма, руб (с НДС)": (price_discounted * totals['Кол-во']).round(2),
+    })
+
+
+def assemble_spec(radiators, brackets):
+    """Объединяет радиаторы и кронштейны и нумерует строки"""
+    if radiators.empty and brackets.empty:
+        return pd.DataFrame()
+
+    frames = [frame for frame in (radiators, brackets) if not frame.empty]
+    spec = pd.concat(frames, ignore_index=True)
+    spec.insert(0, "№", np.arange(1, len(spec) + 1))
+    return spec[SPEC_COLUMNS]
+
+
+def _spec_rows(spec):
+    """Строки спецификации без итоговой строки"""
+    if spec.empty:
+        return spec
+    return spec[spec["№"].astype(str) != "Итого"]
+
+
+def calculate_total_power(spec):
+    """Суммарная мощность (Вт) с учетом количества, округленная до 2 знаков"""
+    rows = _spec_rows(spec)
+    if rows.empty:
+        return 0.0
+    power = pd.to_numeric(rows["Мощность, Вт"], errors='coerce').fillna(0).to_numpy(dtype=float)
+    qty = pd.to_numeric(rows["Кол-во"], errors='coerce').fillna(0).to_numpy(dtype=float)
+    return round(float(power @ qty), 2)
+
+
+def calculate_total_weight_and_volume(lines):
+    """
+    Общий вес (кг) и объем (м³) радиаторов без учета кронштейнов.
+
+    lines - строки заказа, уже объединенные с каталогом (см. order_frame),
+    поэтому повторный поиск по каталогу не нужен.
+    """
+    if lines.empty:
+        return 0.0, 0.0
+    qty = lines['Кол-во'].to_numpy(dtype=float)
+    weight = float(lines['Вес, кг'].to_numpy(dtype=float) @ qty)
+    volume = float(lines['Объем, м3'].to_numpy(dtype=float) @ qty)
+    return round(weight, 1), round(volume, 3)
+
+
+def spec_totals(lines, spec):
+    """
+    Все итоги спецификации за один проход по столбцам.
+
+    lines - строки заказа из order_frame, spec - спецификация из assemble_spec.
+    """
+    rows = _spec_rows(spec)
+    weight, volume = calculate_total_weight_and_volume(lines)
+    radiators = int(lines['Кол-во'].sum()) if not lines.empty else 0
+    quantities = int(rows["Кол-во"].sum()) if not rows.empty else 0
+    return SpecTotals(
+        power=calculate_total_power(rows),
+        weight=weight,
+        volume=volume,
+        radiators=radiators,
+        brackets=quantities - radiators,
+        sum=float(rows["Сумма, руб (с НДС)"].sum()) if not rows.empty else 0.0,
+    )
+
+
+def add_total_row(spec, totals):
+    """Добавляет итоговую строку к спецификации"""
+    if spec.empty:
+        return spec
+
+    total_row = pd.DataFrame([{
+        "№": "Итого",
+        "Артикул": "",
+        "Наименование": "",
+        "Мощность, Вт": "",
+        "Цена, руб (с НДС)": "",
+        "Скидка, %": "",
+        "Цена со скидкой, руб (с НДС)": "",
+        "Кол-во": f"{totals.radiators} / {totals.brackets}",
+        "Сумма, руб (с НДС)": f"{totals.sum:.2f}"
+    }])
+    return pd.concat([spec, total_row], ignore_index=True)